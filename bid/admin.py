@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Product, ProductMatrix, Category, Shop, Provider, Unit, Stock
+from .paginator import EstimatedCountPaginator
+from .models import Product, ProductMatrix, Category, Shop, Provider, Unit, Stock, PriceList, PriceListItem
 
 
 @admin.register(Category)
@@ -11,6 +12,7 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name']
     prepopulated_fields = {'slug': ('name',)}
     empty_value_display = '(Основная)'
+    list_select_related = ('root_category',)
     ordering = ('root_category', 'name')
 
 
@@ -22,6 +24,12 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ['name', 'barcode']
     raw_id_fields = ['category']
     prepopulated_fields = {'slug': ('name',)}
+    list_select_related = ('category', 'unit')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('matrix')
 
 
 @admin.register(Stock)
@@ -56,4 +64,26 @@ class UnitAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 
+class PriceListItemInline(admin.TabularInline):
+    model = PriceListItem
+    fields = ['product', 'old_price', 'price']
+    readonly_fields = ['product', 'old_price', 'price']
+    can_delete = False
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PriceList)
+class PriceListAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created', 'user', 'items_count', 'changed_count']
+    list_filter = ('created',)
+    readonly_fields = ['user', 'created', 'items_count', 'changed_count']
+    inlines = [PriceListItemInline]
+
+
 admin.site.register(ProductMatrix)
@@ -1,15 +1,42 @@
 from django.core.paginator import Paginator, EmptyPage
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import permissions
 from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
 from rest_framework.views import APIView
 
+from accounts.models import ShopUser
+from bid.cache import CATEGORIES_VERSION, get_cache_version
 from bid.models import Product, Category
-from bid.services import get_categories_by_root_category_service
-from .serializers import ProductSerializer, CategorySerializer
+from bid.services import (get_categories_by_root_category_service, get_search_page_service, suggest_products_service,
+                          get_catalog_changes_service, create_products_batch_service, apply_price_list_service)
+from bid.pagination import paginate_by_cursor
+from .serializers import (ProductSerializer, CategorySerializer, ProductSuggestionSerializer, DeletedProductSerializer,
+                          ProductBatchItemSerializer, PriceListItemSerializer)
 
 
+def _product_last_modified(request, pk):
+    """ Дата изменения товара для условных запросов, вычисляется один раз на запрос """
+    if not hasattr(request, '_product_last_modified'):
+        request._product_last_modified = Product.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+
+    return request._product_last_modified
+
+
+def _product_etag(request, pk):
+    """ ETag товара, учитывает изменения в пределах секунды """
+    updated_at = _product_last_modified(request, pk)
+    return f'product-{pk}-{updated_at.timestamp()}' if updated_at else None
+
+
+def _categories_etag(request):
+    """ ETag дерева категорий по его версии """
+    return f'categories-{get_cache_version(CATEGORIES_VERSION)}'
+
+
+@method_decorator(condition(etag_func=_product_etag, last_modified_func=_product_last_modified), name='get')
 class ProductApiView(APIView):
     """ Товар """
     permission_classes = [permissions.IsAuthenticated, ]
@@ -17,7 +44,7 @@ class ProductApiView(APIView):
 
     def get(self, request, pk):
         try:
-            serializer = ProductSerializer(Product.objects.get(pk=pk))
+            serializer = ProductSerializer(ProductSerializer.setup_eager_loading(Product.objects.all()).get(pk=pk))
             return Response({'product': serializer.data}, status=200)
         except Product.DoesNotExist:
             return Response({'error': 'Товар не найден'}, status=404)
@@ -56,12 +83,38 @@ class ProductsApiView(APIView):
             except ValueError:
                 return Response({'error': 'Некорректное значение параметра limit'}, status=422)
 
+            if 'changed_since' in request.query_params:
+                try:
+                    products, deleted, watermark, has_more = get_catalog_changes_service(
+                        request.query_params['changed_since'], limit
+                    )
+                except ValueError as err:
+                    return Response({'error': str(err)}, status=422)
+
+                return Response({
+                    'products': ProductSerializer(products, many=True).data,
+                    'deleted': DeletedProductSerializer(deleted, many=True).data,
+                    'watermark': watermark,
+                    'has_more': has_more
+                }, status=200)
+
             if category_id is not None:
-                category = Category.objects.get(category_id)
+                category = Category.objects.get(id=category_id)
                 products = Product.objects.filter(category=category)
             else:
                 products = Product.objects.all()
 
+            products = ProductSerializer.setup_eager_loading(products)
+
+            if 'cursor' in request.query_params:
+                try:
+                    products_page, next_cursor = paginate_by_cursor(products, request.query_params['cursor'], limit)
+                except ValueError as err:
+                    return Response({'error': str(err)}, status=422)
+
+                serializer = ProductSerializer(products_page, many=True)
+                return Response({'products': serializer.data, 'next': next_cursor}, status=200)
+
             paginator = Paginator(products, limit)
 
             try:
@@ -77,6 +130,29 @@ class ProductsApiView(APIView):
             return Response({'error': 'Категория не найдена'}, status=404)
 
     def post(self, request):
+        if 'products' in request.data:
+            items = request.data.get('products')
+
+            if not isinstance(items, list):
+                return Response({'error': {'head': 'Данные не прошли проверку',
+                                           'message': 'Ожидается список товаров'}}, status=400)
+
+            # Строки проверяются без обращения к базе, в сервис передаются только корректные
+            serializers = [ProductBatchItemSerializer(data=item) for item in items]
+            valid = [serializer.validated_data for serializer in serializers if serializer.is_valid()]
+            created_results = iter(create_products_batch_service(valid))
+            results = []
+
+            for index, (item, serializer) in enumerate(zip(items, serializers)):
+                if serializer.errors:
+                    results.append({'index': index, 'barcode': item.get('barcode') if isinstance(item, dict) else None,
+                                    'status': 'error', 'errors': serializer.errors})
+                else:
+                    results.append({'index': index, **next(created_results)})
+
+            created = sum(1 for result in results if result['status'] == 'created')
+            return Response({'created': created, 'products': results}, status=200)
+
         try:
             data = request.data.get('product')
             serializer = ProductSerializer(data=data)
@@ -88,6 +164,92 @@ class ProductsApiView(APIView):
             return Response({'error': {'head': 'Данные не прошли проверку', 'message': str(v_err)}}, status=400)
 
 
+class PriceListApiView(APIView):
+    """ Загрузка прайс-листа """
+    permission_classes = [permissions.IsAuthenticated, ]
+    parser_classes = (JSONParser,)
+
+    def post(self, request):
+        try:
+            serializer = PriceListItemSerializer(data=request.data.get('prices'), many=True)
+            serializer.is_valid(raise_exception=True)
+
+            price_list, not_found = apply_price_list_service(serializer.validated_data, request.user)
+            return Response({'price_list': price_list.id, 'items_count': price_list.items_count,
+                             'changed_count': price_list.changed_count, 'not_found': not_found}, status=200)
+        except ValidationError as v_err:
+            return Response({'error': {'head': 'Данные не прошли проверку', 'message': str(v_err)}}, status=400)
+
+
+class ProductSearchApiView(APIView):
+    """ Поиск товаров """
+    permission_classes = [permissions.IsAuthenticated, ]
+    parser_classes = (JSONParser,)
+    max_limit = 100
+
+    def get(self, request):
+        word = request.query_params.get('q', '').strip()
+
+        if not word:
+            return Response({'error': 'Не задан параметр q'}, status=422)
+
+        try:
+            page = int(request.query_params.get('page', 1))
+        except ValueError:
+            return Response({'error': 'Некорректное значение параметра page'}, status=422)
+
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            return Response({'error': 'Некорректное значение параметра limit'}, status=422)
+
+        if limit < 1:
+            return Response({'error': 'Некорректное значение параметра limit'}, status=422)
+
+        limit = min(limit, self.max_limit)
+
+        try:
+            products, truncated = get_search_page_service(request.user, word, page, limit)
+        except ShopUser.DoesNotExist:
+            return Response({'error': 'Пользователь магазина не найден'}, status=404)
+
+        serializer = ProductSerializer(products, many=True)
+        return Response({
+            'products': serializer.data,
+            'page': products.number,
+            'num_pages': products.paginator.num_pages,
+            'count': products.paginator.count,
+            'truncated': truncated
+        }, status=200)
+
+
+class ProductSuggestApiView(APIView):
+    """ Подсказки товаров при вводе """
+    permission_classes = [permissions.IsAuthenticated, ]
+    parser_classes = (JSONParser,)
+    max_limit = 50
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': 'Некорректное значение параметра limit'}, status=422)
+
+        if limit < 1:
+            return Response({'error': 'Некорректное значение параметра limit'}, status=422)
+
+        limit = min(limit, self.max_limit)
+
+        try:
+            suggestions = suggest_products_service(request.user, request.query_params.get('q', ''), limit)
+        except ShopUser.DoesNotExist:
+            return Response({'error': 'Пользователь магазина не найден'}, status=404)
+
+        serializer = ProductSuggestionSerializer(suggestions, many=True)
+        return Response({'products': serializer.data}, status=200)
+
+
+@method_decorator(condition(etag_func=_categories_etag), name='get')
 class CategoriesApiView(APIView):
     """ Категории товара """
     permission_classes = [permissions.IsAuthenticated, ]
@@ -1,8 +1,45 @@
+from django.db.models import QuerySet, prefetch_related_objects
 from pytils.translit import slugify
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
 
-from bid.models import Product, Category, Unit, ProductMatrix
+from bid.models import Product, Category, Unit, ProductMatrix, DeletedProduct
+
+
+class EagerLoadingMixin:
+    """ Объявление связанных данных, необходимых сериализатору
+
+    При сериализации списка связанные данные загружаются заранее, поэтому количество
+    запросов не зависит от размера списка.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, objects):
+        """Загрузка связанных данных
+
+        :param objects: Выборка, страница или список объектов
+        :return: Выборка с подключенной загрузкой связанных данных либо исходный список
+        """
+        if isinstance(objects, QuerySet):
+            if cls.select_related_fields:
+                objects = objects.select_related(*cls.select_related_fields)
+            if cls.prefetch_related_fields:
+                objects = objects.prefetch_related(*cls.prefetch_related_fields)
+            return objects
+
+        if cls.select_related_fields or cls.prefetch_related_fields:
+            prefetch_related_objects(list(objects), *cls.select_related_fields, *cls.prefetch_related_fields)
+        return objects
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        if args:
+            args = (cls.setup_eager_loading(args[0]), *args[1:])
+        elif kwargs.get('instance') is not None:
+            kwargs['instance'] = cls.setup_eager_loading(kwargs['instance'])
+        return super().many_init(*args, **kwargs)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -25,8 +62,9 @@ class CategorySerializer(serializers.ModelSerializer):
         return category
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """ Сериализация продуктов """
+    prefetch_related_fields = ('matrix',)
 
     class Meta:
         model = Product
@@ -53,6 +91,23 @@ class ProductSerializer(serializers.ModelSerializer):
         return instance
 
 
+class ProductBatchItemSerializer(serializers.Serializer):
+    """ Проверка строки пакетной загрузки товаров без обращения к базе """
+    barcode = serializers.CharField(max_length=13)
+    name = serializers.CharField(max_length=150)
+    category = serializers.IntegerField()
+    unit = serializers.IntegerField()
+    matrix = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    storage_condition = serializers.ChoiceField(choices=Product.STORAGE_CONDITION, default=Product.ORDINARY)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class PriceListItemSerializer(serializers.Serializer):
+    """ Проверка позиции прайс-листа """
+    barcode = serializers.CharField(max_length=13)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+
+
 class UnitSerializer(serializers.ModelSerializer):
     """ Сериализация мер исчисления """
 
@@ -67,3 +122,20 @@ class ProductMatrixSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductMatrix
         fields = ('id', 'name')
+
+
+class ProductSuggestionSerializer(serializers.Serializer):
+    """ Сериализация подсказок товаров """
+    id = serializers.IntegerField()
+    barcode = serializers.CharField()
+    name = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    unit = serializers.CharField(source='unit_name')
+
+
+class DeletedProductSerializer(serializers.ModelSerializer):
+    """ Сериализация удалённых товаров """
+
+    class Meta:
+        model = DeletedProduct
+        fields = ('product_id', 'barcode', 'deleted_at')
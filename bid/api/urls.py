@@ -8,6 +8,9 @@ urlpatterns = [
     path('products/', include([
         path('', api.ProductsApiView.as_view()),
         path('<int:pk>', api.ProductApiView.as_view()),
+        path('search', api.ProductSearchApiView.as_view()),
+        path('suggest', api.ProductSuggestApiView.as_view()),
+        path('prices', api.PriceListApiView.as_view()),
     ])),
     path('categories/', api.CategoriesApiView.as_view()),
 ]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BidConfig(AppConfig):
     name = 'bid'
     verbose_name = 'Заявка'
+
+    def ready(self):
+        import bid.signals
@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import QuerySet
+
+# Версия каталога: товары, их матрицы, категории и меры исчисления
+CATALOG_VERSION = 'catalog'
+
+# Версия дерева категорий
+CATEGORIES_VERSION = 'categories'
+
+
+def _get_version_key(name: str) -> str:
+    return f'cache_version:{name}'
+
+
+def get_cache_version(name: str) -> int:
+    """Получение текущей версии кэшируемых данных
+
+    Версия хранится в кэше вместе с данными, которые она сбрасывает, и не требует запроса к базе.
+    Если версия вытеснена из кэша, новое значение берётся по текущему времени в микросекундах:
+    оно больше всех выданных ранее, поэтому ключи, сохранённые до вытеснения, не используются.
+
+    :param name: Наименование версии
+    :return: Версия
+    """
+    key = _get_version_key(name)
+    version = cache.get(key)
+
+    if version is None:
+        version = time.time_ns() // 1000
+        # Если версию одновременно создал другой процесс, используется его значение
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+
+    return version
+
+
+def bump_cache_version(name: str) -> None:
+    """Увеличение версии кэшируемых данных, все ключи предыдущей версии становятся недействительными
+
+    :param name: Наименование версии
+    """
+    try:
+        cache.incr(_get_version_key(name))
+    except ValueError:
+        # Версии нет в кэше, новая версия и так отличается от всех предыдущих
+        get_cache_version(name)
+
+
+def _resolve_page_number(paginator: Paginator, page) -> int:
+    """Номер страницы по правилам Paginator.get_page: некорректный - первая, вне диапазона - последняя
+
+    :param paginator: Пагинатор
+    :param page: Номер страницы из запроса
+    :return: Номер страницы
+    """
+    try:
+        return paginator.validate_number(page)
+    except PageNotAnInteger:
+        return 1
+    except EmptyPage:
+        return paginator.num_pages
+
+
+def get_cached_page(queryset: QuerySet, page, per_page: int, key: str) -> Page:
+    """Получение страницы с кэшированием идентификаторов объектов и их общего количества
+
+    Из кэша берутся только идентификаторы и количество, сами объекты всегда читаются из базы,
+    поэтому цены и наименования на странице всегда актуальны. Номер страницы приводится к
+    существующему до построения ключа, поэтому "01", "abc" и номера вне диапазона не создают новых записей.
+
+    :param queryset: Выборка
+    :param page: Номер страницы
+    :param per_page: Кол-во объектов на странице
+    :param key: Префикс ключа кэша, должен включать версию данных
+    :return: Страница
+    """
+    paginator = Paginator(queryset, per_page)
+    count = cache.get(f'{key}:count')
+
+    if count is None:
+        cache.set(f'{key}:count', paginator.count, settings.CATALOG_CACHE_TIMEOUT)
+    else:
+        paginator.count = count
+
+    number = _resolve_page_number(paginator, page)
+    ids = cache.get(f'{key}:{number}')
+
+    if ids is None:
+        page_obj = paginator.page(number)
+        cache.set(f'{key}:{number}', [obj.id for obj in page_obj], settings.CATALOG_CACHE_TIMEOUT)
+        return page_obj
+
+    objects = queryset.in_bulk(ids)
+    return Page([objects[pk] for pk in ids if pk in objects], number, paginator)
+
+
+def get_cached_bounded_page(queryset: QuerySet, page, per_page: int, limit: int, key: str) -> Tuple[Page, bool]:
+    """Получение страницы из первых limit объектов выборки с кэшированием их идентификаторов
+
+    Количество объектов не считается отдельным COUNT: это длина закэшированного списка, не больше limit.
+    Выбирается limit + 1 идентификатор, лишний только показывает, что объектов больше limit.
+
+    :param queryset: Упорядоченная выборка
+    :param page: Номер страницы
+    :param per_page: Кол-во объектов на странице
+    :param limit: Максимальное кол-во объектов
+    :param key: Ключ кэша, должен включать версию данных
+    :return: Страница, признак того, что объектов больше limit
+    """
+    cached = cache.get(key)
+
+    if cached is None:
+        ids = list(queryset.values_list('id', flat=True)[:limit + 1])
+        cached = {'ids': ids[:limit], 'truncated': len(ids) > limit}
+        cache.set(key, cached, settings.CATALOG_CACHE_TIMEOUT)
+
+    page_obj = Paginator(cached['ids'], per_page).get_page(page)
+    objects = queryset.in_bulk(page_obj.object_list)
+    page_obj.object_list = [objects[pk] for pk in page_obj.object_list if pk in objects]
+
+    return page_obj, cached['truncated']
+
+
+class PrefixCache:
+    """ Кэш подсказок в памяти процесса с вытеснением давно не используемых записей
+
+    Если для более короткого префикса того же запроса уже сохранён полный набор результатов
+    (меньше лимита), результаты для более длинного префикса получаются его фильтрацией без запроса к базе.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace, query: str, limit: int, matches: Callable[[dict], bool]) -> Optional[List[dict]]:
+        """Получение результатов из кэша
+
+        :param namespace: Пространство ключей, например матрица товаров и версия каталога
+        :param query: Запрос
+        :param limit: Максимальное кол-во результатов
+        :param matches: Проверка соответствия результата более короткого префикса запросу
+        :return: Результаты или None, если их нет в кэше
+        """
+        with self._lock:
+            entry = self._data.get((namespace, query))
+
+            if entry is not None and (entry[1] >= limit or len(entry[0]) < entry[1]):
+                self._data.move_to_end((namespace, query))
+                return entry[0][:limit]
+
+            for length in range(len(query) - 1, 0, -1):
+                entry = self._data.get((namespace, query[:length]))
+
+                if entry is not None and len(entry[0]) < entry[1]:
+                    return [item for item in entry[0] if matches(item)][:limit]
+
+        return None
+
+    def set(self, namespace, query: str, limit: int, results: List[dict]) -> None:
+        """Сохранение результатов в кэш
+
+        :param namespace: Пространство ключей
+        :param query: Запрос
+        :param limit: Кол-во запрошенных результатов
+        :param results: Результаты
+        """
+        with self._lock:
+            self._data[(namespace, query)] = (results, limit)
+            self._data.move_to_end((namespace, query))
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
@@ -0,0 +1,238 @@
+import csv
+import io
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from pytils.translit import slugify
+
+from bid.cache import CATALOG_VERSION, bump_cache_version
+from bid.models import Category, Product, ProductMatrix, Unit
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('barcode', 'name', 'unit', 'category', 'price', 'matrices')
+MATRIX_SEPARATOR = '|'
+STAGING_TABLE = 'bid_import_catalog_staging'
+
+# Справочники, загруженные в процесс-обработчик один раз при его запуске
+_references = {}
+
+
+def _init_worker(units: dict, categories: dict, matrices: set, slug_length: int) -> None:
+    """Загрузка справочников в процесс-обработчик
+
+    :param units: Идентификаторы мер исчисления по краткому наименованию
+    :param categories: Идентификаторы категорий по ЧПУ
+    :param matrices: Идентификаторы матриц товаров
+    :param slug_length: Максимальная длина ЧПУ товара
+    """
+    _references.update(units=units, categories=categories, matrices=matrices, slug_length=slug_length)
+
+
+def _prepare_chunk(chunk: list) -> tuple:
+    """Проверка строк файла и формирование ЧПУ
+
+    :param chunk: Пары из номера строки и значений колонок
+    :return: Строки для промежуточной таблицы и ошибки
+    """
+    rows, errors = [], []
+
+    for line, values in chunk:
+        if len(values) != len(COLUMNS):
+            errors.append((line, 'Некорректное количество колонок'))
+            continue
+
+        barcode, name, unit, category, price, matrices = (value.strip() for value in values)
+
+        try:
+            price = Decimal(price.replace(',', '.'))
+            matrix_ids = {int(matrix) for matrix in matrices.split(MATRIX_SEPARATOR) if matrix.strip()}
+        except (InvalidOperation, ValueError):
+            errors.append((line, 'Некорректная цена или матрица товаров'))
+            continue
+
+        if not barcode.isdigit() or len(barcode) > 13:
+            errors.append((line, f'Некорректный штрих-код {barcode}'))
+        elif not name or len(name) > 150:
+            errors.append((line, 'Некорректное наименование товара'))
+        elif unit not in _references['units']:
+            errors.append((line, f'Мера исчисления {unit} не найдена'))
+        elif category not in _references['categories']:
+            errors.append((line, f'Категория {category} не найдена'))
+        # NaN и бесконечность не сравниваются, а слишком большие значения не округляются, поэтому проверяются первыми
+        elif not price.is_finite() or price < 0 or price >= 10 ** 8 or price != price.quantize(Decimal('0.01')):
+            errors.append((line, f'Некорректная цена {price}'))
+        elif not matrix_ids or not _references['matrices'].issuperset(matrix_ids):
+            errors.append((line, 'Матрица товаров не найдена'))
+        else:
+            slug = slugify(name)[:_references['slug_length']]
+            rows.append((line, barcode, name, slug, _references['units'][unit], _references['categories'][category],
+                         price, '{' + ','.join(map(str, sorted(matrix_ids))) + '}'))
+
+    return rows, errors
+
+
+class Command(BaseCommand):
+    help = 'Полная загрузка каталога товаров из CSV/TSV файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Файл с колонками: ' + ', '.join(COLUMNS))
+        parser.add_argument('--delimiter', help='Разделитель колонок (по умолчанию по расширению файла)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Количество процессов проверки')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Количество строк в пакете')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        delimiter = options['delimiter'] or ('\t' if path.endswith('.tsv') else ',')
+
+        try:
+            source = open(path, encoding='utf-8-sig', newline='')
+        except OSError as err:
+            raise CommandError(f'Не удалось открыть файл {path}: {err}')
+
+        units = dict(Unit.objects.values_list('short_name', 'id'))
+        categories = dict(Category.objects.values_list('slug', 'id'))
+        matrices = set(ProductMatrix.objects.values_list('id', flat=True))
+        references = (units, categories, matrices, Product._meta.get_field('slug').max_length)
+
+        with source, transaction.atomic():
+            reader = csv.reader(source, delimiter=delimiter)
+            header = [column.strip().lower() for column in next(reader, [])]
+
+            if tuple(header) != COLUMNS:
+                raise CommandError('Ожидаются колонки: ' + ', '.join(COLUMNS))
+
+            with connection.cursor() as cursor:
+                self._create_staging_table(cursor)
+                loaded, errors = self._copy_rows(cursor, reader, options, references)
+                created, updated, matrix_changed = self._merge(cursor)
+
+            bump_cache_version(CATALOG_VERSION)
+
+        for line, error in errors:
+            self.stderr.write(f'Строка {line}: {error}')
+
+        logger.info(f'Импорт каталога {path}: загружено {loaded}, создано {created}, обновлено {updated}, '
+                    f'изменены матрицы {matrix_changed}, ошибок {len(errors)}')
+        self.stdout.write(self.style.SUCCESS(f'Загружено строк: {loaded}, создано товаров: {created}, '
+                                             f'обновлено: {updated}, изменены матрицы: {matrix_changed}, '
+                                             f'ошибок: {len(errors)}'))
+
+    @staticmethod
+    def _create_staging_table(cursor) -> None:
+        """Создание промежуточной таблицы, удаляемой при завершении транзакции
+
+        :param cursor: Курсор базы данных
+        """
+        cursor.execute(f'DROP TABLE IF EXISTS {STAGING_TABLE}')
+        cursor.execute(f'''
+            CREATE TEMPORARY TABLE {STAGING_TABLE} (
+                line integer NOT NULL,
+                barcode varchar(13) NOT NULL,
+                name varchar(150) NOT NULL,
+                slug varchar(150) NOT NULL,
+                unit_id integer NOT NULL,
+                category_id integer NOT NULL,
+                price numeric(10, 2) NOT NULL,
+                matrices integer[] NOT NULL
+            ) ON COMMIT DROP
+        ''')
+
+    @staticmethod
+    def _copy_rows(cursor, reader, options: dict, references: tuple) -> tuple:
+        """Проверка строк в пуле процессов и загрузка их в промежуточную таблицу через COPY
+
+        :param cursor: Курсор базы данных
+        :param reader: Строки файла
+        :param options: Параметры команды
+        :param references: Справочники мер исчисления, категорий, матриц и длина ЧПУ
+        :return: Количество загруженных строк и ошибки
+        """
+        numbered = ((line, values) for line, values in enumerate(reader, start=2) if any(values))
+        chunks = iter(lambda: list(islice(numbered, options['chunk_size'])), [])
+        # Файл читается по мере обработки: в работе не больше двух частей на процесс
+        window = options['workers'] * 2
+        loaded, errors = 0, []
+
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker,
+                                 initargs=references) as executor:
+            pending = deque(executor.submit(_prepare_chunk, chunk) for chunk in islice(chunks, window))
+
+            while pending:
+                rows, chunk_errors = pending.popleft().result()
+
+                for chunk in islice(chunks, 1):
+                    pending.append(executor.submit(_prepare_chunk, chunk))
+
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                buffer.seek(0)
+                cursor.copy_expert(f'COPY {STAGING_TABLE} FROM STDIN WITH (FORMAT csv)', buffer)
+
+                loaded += len(rows)
+                errors.extend(chunk_errors)
+
+        return loaded, errors
+
+    @staticmethod
+    def _merge(cursor) -> tuple:
+        """Перенос данных из промежуточной таблицы в каталог
+
+        :param cursor: Курсор базы данных
+        :return: Количество созданных и обновлённых товаров и товаров с изменёнными матрицами
+        """
+        # При повторе штрих-кода в файле действует последняя строка
+        cursor.execute(f'''
+            DELETE FROM {STAGING_TABLE} s USING {STAGING_TABLE} t
+            WHERE s.barcode = t.barcode AND s.line < t.line
+        ''')
+        cursor.execute(f'CREATE INDEX ON {STAGING_TABLE} (barcode)')
+        cursor.execute(f'ANALYZE {STAGING_TABLE}')
+
+        # ЧПУ новых товаров, занятые другими товарами или повторяющиеся в файле, дополняются штрих-кодом
+        cursor.execute(f'''
+            INSERT INTO bid_product (barcode, name, slug, unit_id, category_id, price, storage_condition,
+                                     created_at, updated_at)
+            SELECT s.barcode, s.name,
+                   CASE WHEN count(*) OVER (PARTITION BY s.slug) > 1
+                             OR EXISTS (SELECT 1 FROM bid_product p WHERE p.slug = s.slug)
+                        THEN left(s.slug, 149 - length(s.barcode)) || '-' || s.barcode
+                        ELSE s.slug END,
+                   s.unit_id, s.category_id, s.price, %s, now(), now()
+            FROM {STAGING_TABLE} s
+            ON CONFLICT (barcode) DO UPDATE
+            SET name = EXCLUDED.name, unit_id = EXCLUDED.unit_id, category_id = EXCLUDED.category_id,
+                price = EXCLUDED.price, updated_at = EXCLUDED.updated_at
+            WHERE (bid_product.name, bid_product.unit_id, bid_product.category_id, bid_product.price)
+                  IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.unit_id, EXCLUDED.category_id, EXCLUDED.price)
+            RETURNING (xmax = 0)
+        ''', [Product.ORDINARY])
+        inserted = [row[0] for row in cursor.fetchall()]
+        created = sum(inserted)
+
+        cursor.execute(f'''
+            WITH removed AS (
+                DELETE FROM bid_product_matrix pm
+                USING bid_product p, {STAGING_TABLE} s
+                WHERE pm.product_id = p.id AND p.barcode = s.barcode AND pm.productmatrix_id <> ALL(s.matrices)
+                RETURNING pm.product_id
+            ), added AS (
+                INSERT INTO bid_product_matrix (product_id, productmatrix_id)
+                SELECT p.id, m.id
+                FROM {STAGING_TABLE} s
+                JOIN bid_product p ON p.barcode = s.barcode
+                CROSS JOIN unnest(s.matrices) AS m(id)
+                ON CONFLICT (product_id, productmatrix_id) DO NOTHING
+                RETURNING product_id
+            )
+            UPDATE bid_product SET updated_at = now()
+            WHERE id IN (SELECT product_id FROM removed UNION SELECT product_id FROM added)
+        ''')
+
+        return created, len(inserted) - created, cursor.rowcount
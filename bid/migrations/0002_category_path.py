@@ -0,0 +1,41 @@
+# Generated by Django 2.2.18 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bid', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Уровень вложенности'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255, verbose_name='Путь в дереве категорий'),
+        ),
+        migrations.RunSQL(
+            """
+            WITH RECURSIVE tree AS (
+                SELECT id, id::text || '/' AS path, 0 AS depth
+                FROM bid_category
+                WHERE root_category_id IS NULL
+                UNION ALL
+                SELECT c.id, tree.path || c.id::text || '/', tree.depth + 1
+                FROM bid_category c
+                JOIN tree ON c.root_category_id = tree.id
+            )
+            UPDATE bid_category
+            SET path = tree.path, depth = tree.depth
+            FROM tree
+            WHERE bid_category.id = tree.id;
+            """,
+            migrations.RunSQL.noop
+        ),
+    ]
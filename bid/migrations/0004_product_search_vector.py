@@ -0,0 +1,52 @@
+# Generated by Django 2.2.18 on 2026-10-18 11:59
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bid', '0003_cacheversion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='bid_product_barcode_d4e845_gin',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION bid_product_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.barcode, '')), 'A') ||
+                    setweight(to_tsvector('pg_catalog.russian', coalesce(NEW.name, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER bid_product_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF barcode, name ON bid_product
+            FOR EACH ROW EXECUTE PROCEDURE bid_product_search_vector_update();
+
+            UPDATE bid_product SET search_vector =
+                setweight(to_tsvector('pg_catalog.russian', coalesce(barcode, '')), 'A') ||
+                setweight(to_tsvector('pg_catalog.russian', coalesce(name, '')), 'B');
+            """,
+            """
+            DROP TRIGGER IF EXISTS bid_product_search_vector_trigger ON bid_product;
+            DROP FUNCTION IF EXISTS bid_product_search_vector_update();
+            """
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='bid_product_search__b2d730_gin'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:10
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bid', '0004_product_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Индекс по выражению UPPER(name), которое Django строит для icontains/istartswith
+        migrations.RunSQL(
+            'CREATE INDEX bid_product_name_upper_trgm ON bid_product USING gin (UPPER(name) gin_trgm_ops);',
+            'DROP INDEX IF EXISTS bid_product_name_upper_trgm;'
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bid', '0006_product_name_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedProduct',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.IntegerField(verbose_name='Идентификатор товара')),
+                ('barcode', models.CharField(max_length=13, verbose_name='Штрих-код')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата удаления')),
+            ],
+            options={
+                'verbose_name': 'Удалённый товар',
+                'verbose_name_plural': 'Удалённые товары',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at', 'id'], name='bid_product_updated_7d6798_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bid', '0007_product_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceList',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата загрузки')),
+                ('items_count', models.PositiveIntegerField(default=0, verbose_name='Количество позиций')),
+                ('changed_count', models.PositiveIntegerField(default=0, verbose_name='Изменено цен')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Прайс-лист',
+                'verbose_name_plural': 'Прайс-листы',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceListItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Прежняя цена')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('price_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='bid.PriceList', verbose_name='Прайс-лист')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_list_items', to='bid.Product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Позиция прайс-листа',
+                'verbose_name_plural': 'Позиции прайс-листа',
+                'unique_together': {('price_list', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:45
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bid', '0008_price_list'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='CacheVersion',
+        ),
+    ]
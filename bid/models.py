@@ -1,5 +1,9 @@
+from django.contrib.auth.models import User
 from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from django.urls import reverse
 
 from cart.forms import CartAddProductForm
@@ -50,6 +54,11 @@ class Category(models.Model):
     slug = models.SlugField("ЧПУ", max_length=150, unique=True, db_index=True)
     root_category = models.ForeignKey('self', verbose_name='Родительская категория', on_delete=models.CASCADE,
                                       null=True, blank=True)
+    # Материализованный путь вида "1/5/12/": идентификаторы всех предков и самой категории
+    path = models.CharField("Путь в дереве категорий", max_length=255, db_index=True, editable=False, default='')
+    depth = models.PositiveSmallIntegerField("Уровень вложенности", editable=False, default=0)
+
+    PATH_SEPARATOR = '/'
 
     class Meta:
         verbose_name = 'Категория'
@@ -61,6 +70,44 @@ class Category(models.Model):
     def get_absolute_url(self):
         return reverse('bid:product_list_by_category', args=[self.slug])
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._update_path()
+
+    def _update_path(self):
+        """ Пересчёт пути категории и всех её потомков после сохранения """
+        parent_path = self.root_category.path if self.root_category_id else ''
+        path = f'{parent_path}{self.id}{self.PATH_SEPARATOR}'
+
+        if path == self.path:
+            return
+
+        old_path, old_depth = self.path, self.depth
+        depth = path.count(self.PATH_SEPARATOR) - 1
+        Category.objects.filter(id=self.id).update(path=path, depth=depth)
+
+        if old_path:
+            Category.objects.filter(path__startswith=old_path).exclude(id=self.id).update(
+                path=Concat(Value(path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (depth - old_depth)
+            )
+
+        self.path, self.depth = path, depth
+
+    def get_descendants(self, include_self: bool = False):
+        """ Все вложенные категории любого уровня одним запросом """
+        descendants = Category.objects.filter(path__startswith=self.path)
+        return descendants if include_self else descendants.exclude(id=self.id)
+
+    def get_ancestors(self, include_self: bool = False):
+        """ Все родительские категории от корня одним запросом """
+        ids = [int(pk) for pk in self.path.split(self.PATH_SEPARATOR) if pk]
+
+        if not include_self:
+            ids = ids[:-1]
+
+        return Category.objects.filter(id__in=ids).order_by('depth')
+
 
 class Product(models.Model):
     """ Модель товара """
@@ -86,12 +133,19 @@ class Product(models.Model):
                                          default=ORDINARY)
     created_at = models.DateTimeField("Дата создания", auto_now_add=True)
     updated_at = models.DateTimeField("Дата обновления", auto_now=True)
+    # Заполняется триггером bid_product_search_vector_trigger по штрих-коду и наименованию
+    search_vector = SearchVectorField("Поисковый вектор", null=True, editable=False)
+
+    SEARCH_CONFIG = 'russian'
 
     class Meta:
         ordering = ('name',)
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
-        indexes = [GinIndex(fields=['barcode', 'name'])]
+        indexes = [
+            GinIndex(fields=['search_vector']),
+            models.Index(fields=['updated_at', 'id']),
+        ]
 
     def __str__(self):
         return self.name
@@ -105,6 +159,54 @@ class Product(models.Model):
     display_matrix.short_description = 'Матрицы'
 
 
+class DeletedProduct(models.Model):
+    """ Модель удалённого товара для синхронизации изменений каталога """
+    product_id = models.IntegerField("Идентификатор товара")
+    barcode = models.CharField("Штрих-код", max_length=13)
+    deleted_at = models.DateTimeField("Дата удаления", auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Удалённый товар'
+        verbose_name_plural = 'Удалённые товары'
+
+    def __str__(self):
+        return self.barcode
+
+
+class PriceList(models.Model):
+    """ Модель прайс-листа, версия цен каталога """
+    user = models.ForeignKey(User, verbose_name='Пользователь', on_delete=models.SET_NULL, null=True, blank=True)
+    created = models.DateTimeField("Дата загрузки", auto_now_add=True)
+    items_count = models.PositiveIntegerField("Количество позиций", default=0)
+    changed_count = models.PositiveIntegerField("Изменено цен", default=0)
+
+    class Meta:
+        verbose_name = 'Прайс-лист'
+        verbose_name_plural = 'Прайс-листы'
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f'Прайс-лист №{self.id}'
+
+
+class PriceListItem(models.Model):
+    """ Модель позиции прайс-листа """
+    price_list = models.ForeignKey(PriceList, verbose_name='Прайс-лист', on_delete=models.CASCADE,
+                                   related_name='items')
+    product = models.ForeignKey(Product, verbose_name='Товар', on_delete=models.CASCADE,
+                                related_name='price_list_items')
+    old_price = models.DecimalField("Прежняя цена", max_digits=10, decimal_places=2)
+    price = models.DecimalField("Цена", max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Позиция прайс-листа'
+        verbose_name_plural = 'Позиции прайс-листа'
+        unique_together = ('price_list', 'product')
+
+    def __str__(self):
+        return f'{self.product}: {self.old_price} -> {self.price}'
+
+
 class Stock(models.Model):
     """ Модель склада """
     name = models.CharField("Наименование склада", max_length=100)
@@ -166,3 +268,4 @@ class Provider(Organization):
 
 
 Provider._meta.get_field('name').verbose_name = 'Наименование поставщика'
+
@@ -0,0 +1,101 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Tuple, List, Optional, Sequence
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(values: dict) -> str:
+    """Кодирование значений ключа последнего объекта страницы в непрозрачный курсор
+
+    :param values: Значения полей ключа
+    :return: Курсор
+    """
+    # Даты передаются с микросекундами: DjangoJSONEncoder округляет их до миллисекунд
+    values = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in values.items()}
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode()).decode()
+
+
+def decode_cursor(cursor: str, queryset: QuerySet, keys: Sequence[str], datetime_keys: Sequence[str] = ()) -> dict:
+    """Декодирование курсора
+
+    :param cursor: Курсор
+    :param queryset: Выборка, для которой выдан курсор
+    :param keys: Поля ключа
+    :param datetime_keys: Дополнительные значения с датой и временем, не являющиеся полями модели
+    :return: Значения полей ключа
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        result = {}
+
+        for key in (*keys, *datetime_keys):
+            field = queryset.model._meta.get_field(key) if key in keys else models.DateTimeField()
+            value = values[key]
+
+            if isinstance(field, models.DateTimeField):
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError
+            else:
+                value = field.to_python(value)
+
+            result[key] = value
+    except (binascii.Error, UnicodeDecodeError, AttributeError, TypeError, KeyError, ValueError, ValidationError):
+        raise ValueError('Некорректное значение параметра cursor')
+
+    return result
+
+
+def filter_after_key(queryset: QuerySet, keys: Sequence[str], values: dict) -> QuerySet:
+    """Отбор объектов, ключ которых строго больше заданного
+
+    :param queryset: Выборка
+    :param keys: Поля ключа
+    :param values: Значения полей ключа
+    :return: Выборка
+    """
+    # (k1, k2, ...) > (v1, v2, ...) в виде, по первому полю которого можно сканировать индекс
+    after = Q()
+    for i, key in enumerate(keys):
+        condition = Q(**{f'{key}__gt': values[key]})
+        for previous in keys[:i]:
+            condition &= Q(**{previous: values[previous]})
+        after |= condition
+
+    return queryset.filter(Q(**{f'{keys[0]}__gte': values[keys[0]]}), after)
+
+
+def paginate_by_cursor(queryset: QuerySet, cursor: str, limit: int,
+                       keys: Sequence[str] = ('id',)) -> Tuple[List, Optional[str]]:
+    """Постраничная выборка по ключу (keyset) без COUNT и OFFSET
+
+    Стоимость каждой страницы не зависит от её глубины: следующая страница начинается
+    строго после ключа последнего объекта предыдущей.
+
+    :param queryset: Выборка
+    :param cursor: Курсор, пустой для первой страницы
+    :param limit: Кол-во объектов на странице
+    :param keys: Поля ключа по возрастанию, последнее поле должно быть уникальным
+    :return: Объекты страницы, курсор следующей страницы или None
+    """
+    if limit < 1:
+        raise ValueError('Некорректное значение параметра limit')
+
+    if cursor:
+        queryset = filter_after_key(queryset, keys, decode_cursor(cursor, queryset, keys))
+
+    objects = list(queryset.order_by(*keys)[:limit + 1])
+    next_cursor = None
+
+    if len(objects) > limit:
+        objects = objects[:limit]
+        next_cursor = encode_cursor({key: getattr(objects[-1], key) for key in keys})
+
+    return objects, next_cursor
@@ -0,0 +1,39 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """ Пагинатор, берущий количество строк большой таблицы из статистики планировщика
+
+    Оценка используется только для выборки без условий, где точный COUNT(*) требует
+    полного прохода по таблице. Для отфильтрованных выборок и небольших таблиц
+    количество считается точно.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+
+        if query is not None and not query.where:
+            estimate = self._get_estimated_count(self.object_list)
+
+            if estimate > self.exact_count_threshold:
+                return estimate
+
+        return super().count
+
+    @staticmethod
+    def _get_estimated_count(queryset) -> int:
+        """Оценка количества строк таблицы по pg_class.reltuples
+
+        :param queryset: Выборка
+        :return: Оценка количества строк
+        """
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                           [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+
+        return row[0] if row else 0
@@ -1,47 +1,106 @@
+import hashlib
 import logging
-from typing import List
+import re
+from collections import defaultdict
+from datetime import timedelta
+from typing import List, Tuple
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.contrib.postgres.search import SearchVector
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Case, When, IntegerField, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from pytils.translit import slugify
 
 from accounts.models import ShopUser
 from orders.models import Order
-from .models import Category, Product
+from .pagination import encode_cursor, decode_cursor, filter_after_key
+from .cache import (CATALOG_VERSION, PrefixCache, bump_cache_version, get_cache_version, get_cached_page,
+                    get_cached_bounded_page)
+from .models import Category, Product, DeletedProduct, Unit, ProductMatrix, PriceList, PriceListItem
 
 logger = logging.getLogger(__name__)
 
 
-def get_product_list_service(user: User, category_slug: str = None):
-    """Получени товаров на основании категории
+PRODUCTS_PER_PAGE = 12
+
+# Длина штрих-кода EAN-13 и шаблон ввода, похожего на штрих-код или его начало
+BARCODE_LENGTH = 13
+BARCODE_PATTERN = re.compile(r'^\d{1,%d}$' % BARCODE_LENGTH)
+
+# Минимальная длина текста для подсказок: более короткие запросы не могут использовать триграммный индекс
+SUGGEST_MIN_LENGTH = 3
+_suggest_cache = PrefixCache(max_size=5000)
+
+
+def _get_shop_user(user: User) -> ShopUser:
+    """Получение пользователя магазина вместе с магазином
 
     :param user: Пользователь
+    :return: Пользователь магазина
+    """
+    try:
+        return ShopUser.objects.select_related('shop').get(user=user)
+    except ShopUser.DoesNotExist:
+        logger.error(f'Пользователь магазина для {str(user)} не найден')
+        raise
+
+
+def _get_catalog(matrix_id: int, category_slug: str = None):
+    """Получение товаров матрицы на основании категории
+
+    :param matrix_id: Идентификатор матрицы товаров
     :param category_slug: Категория
     :return: Головная категория, дочерние категории, товары
     """
     try:
-        shop_user = ShopUser.objects.get(user=user)
-
         if category_slug:
             category = Category.objects.get(slug=category_slug)
             categories = Category.objects.filter(root_category=category)
-            products_list = Product.objects.filter(
-                Q(category=category) | Q(category__in=categories),
-                matrix=shop_user.shop.product_matrix
-            )
+            # Товары всего поддерева категории одним соединением по индексу материализованного пути
+            products_list = Product.objects.filter(category__path__startswith=category.path, matrix=matrix_id)
         else:
             category = None
             categories = Category.objects.filter(root_category=None)
-            products_list = Product.objects.filter(matrix=shop_user.shop.product_matrix)
-    except ShopUser.DoesNotExist:
-        logger.error(f'Пользователь магазина для {str(user)} не найден')
-        raise
+            products_list = Product.objects.filter(matrix=matrix_id)
     except Category.DoesNotExist:
         logger.error(f'Категория {category_slug} не найдена')
         raise
 
-    return category, categories, products_list
+    return category, categories, products_list.select_related('unit')
+
+
+def get_product_list_service(user: User, category_slug: str = None):
+    """Получени товаров на основании категории
+
+    :param user: Пользователь
+    :param category_slug: Категория
+    :return: Головная категория, дочерние категории, товары
+    """
+    shop_user = _get_shop_user(user)
+    return _get_catalog(shop_user.shop.product_matrix_id, category_slug)
+
+
+def get_product_page_service(user: User, category_slug: str = None, page=None, per_page: int = PRODUCTS_PER_PAGE):
+    """Получение страницы товаров на основании категории с кэшированием по матрице товаров
+
+    :param user: Пользователь
+    :param category_slug: Категория
+    :param page: Номер страницы
+    :param per_page: Кол-во товаров на странице
+    :return: Головная категория, дочерние категории, страница товаров
+    """
+    matrix_id = _get_shop_user(user).shop.product_matrix_id
+    category, categories, products_list = _get_catalog(matrix_id, category_slug)
+
+    key = 'catalog:{}:{}:{}:{}'.format(get_cache_version(CATALOG_VERSION), matrix_id,
+                                       category.id if category else 0, per_page)
+    products = get_cached_page(products_list, page, per_page, key)
+
+    return category, categories, products
 
 
 def search_products_service(user: User, word: str):
@@ -51,17 +110,263 @@ def search_products_service(user: User, word: str):
     :param word: Клчевое слово
     :return: Товары
     """
-    try:
-        shop_user = ShopUser.objects.get(user=user)
-        search_products = Product.objects.annotate(search=SearchVector('barcode', 'name'))\
-                                         .filter(search=word, matrix=shop_user.shop.product_matrix)
-    except ShopUser.DoesNotExist:
-        logger.error(f'Пользователь магазина для {str(user)} не найден')
-        raise
+    shop_user = _get_shop_user(user)
+    return _search_products(shop_user.shop.product_matrix_id, word)
+
+
+def _search_products(matrix_id: int, word: str):
+    """Поиск товаров матрицы по заданному ключевому слову
+
+    :param matrix_id: Идентификатор матрицы товаров
+    :param word: Ключевое слово
+    :return: Товары
+    """
+    products = Product.objects.filter(matrix=matrix_id).select_related('unit')
+    word = word.strip()
+
+    if BARCODE_PATTERN.match(word):
+        # Отсканированный штрих-код ищется по индексам уникального поля: полный - точным совпадением,
+        # частичный - по префиксу через индекс varchar_pattern_ops, который Django создаёт для barcode
+        if len(word) == BARCODE_LENGTH:
+            return products.filter(barcode=word)
+        return products.filter(barcode__startswith=word).order_by('barcode')
+
+    # Поиск по хранимому вектору использует GIN индекс, результаты упорядочены по релевантности
+    query = SearchQuery(word, config=Product.SEARCH_CONFIG)
+    search_products = products.filter(search_vector=query)\
+                              .annotate(rank=SearchRank(F('search_vector'), query))\
+                              .order_by('-rank', 'name')
 
     return search_products
 
 
+def suggest_products_service(user: User, query: str, limit: int = 10) -> List[dict]:
+    """Подсказки товаров матрицы пользователя по началу ввода
+
+    Штрих-коды ищутся по префиксу, текст - по вхождению в наименование с использованием
+    триграммного индекса, совпадения с начала наименования идут первыми.
+    Результаты кэшируются в памяти процесса по матрице товаров, версии каталога и виду запроса.
+
+    :param user: Пользователь
+    :param query: Введённый текст
+    :param limit: Максимальное кол-во подсказок
+    :return: Подсказки
+    """
+    matrix_id = _get_shop_user(user).shop.product_matrix_id
+    query = query.strip().lower()
+    is_barcode = bool(BARCODE_PATTERN.match(query))
+
+    if not is_barcode and len(query) < SUGGEST_MIN_LENGTH:
+        return []
+
+    if is_barcode:
+        def matches(item):
+            return item['barcode'].startswith(query)
+    else:
+        def matches(item):
+            return query in item['name'].lower()
+
+    # Штрих-коды и текст ищутся по-разному, поэтому результаты одного вида не подходят для фильтрации другого
+    namespace = (matrix_id, get_cache_version(CATALOG_VERSION), is_barcode)
+    suggestions = _suggest_cache.get(namespace, query, limit, matches)
+
+    if suggestions is None:
+        if is_barcode:
+            products = _search_products(matrix_id, query)
+        else:
+            prefix_rank = Case(When(name__istartswith=query, then=0), default=1, output_field=IntegerField())
+            products = Product.objects.filter(matrix=matrix_id, name__icontains=query)\
+                                      .annotate(prefix_rank=prefix_rank)\
+                                      .order_by('prefix_rank', 'name')
+
+        suggestions = list(products.values('id', 'barcode', 'name', 'price', unit_name=F('unit__short_name'))[:limit])
+        _suggest_cache.set(namespace, query, limit, suggestions)
+    elif not is_barcode:
+        suggestions.sort(key=lambda item: not item['name'].lower().startswith(query))
+
+    return suggestions
+
+
+def get_search_page_service(user: User, word: str, page=None, per_page: int = PRODUCTS_PER_PAGE):
+    """Получение страницы результатов поиска
+
+    Результаты ограничены настройкой SEARCH_RESULTS_LIMIT, их идентификаторы кэшируются
+    по матрице товаров и ключевому слову до изменения версии каталога.
+
+    :param user: Пользователь
+    :param word: Ключевое слово
+    :param page: Номер страницы
+    :param per_page: Кол-во товаров на странице
+    :return: Страница товаров, признак того, что найдено больше товаров, чем показано
+    """
+    matrix_id = _get_shop_user(user).shop.product_matrix_id
+    limit = settings.SEARCH_RESULTS_LIMIT
+
+    key = 'search:{}:{}:{}'.format(get_cache_version(CATALOG_VERSION), matrix_id,
+                                   hashlib.md5(word.strip().lower().encode()).hexdigest())
+    return get_cached_bounded_page(_search_products(matrix_id, word), page, per_page, limit, key)
+
+
+def get_catalog_changes_service(changed_since: str, limit: int):
+    """Получение изменений каталога для синхронизации устройств
+
+    Товары выдаются по возрастанию (дата обновления, идентификатор) не более limit за вызов.
+    Изменения матриц товара обновляют его дату обновления, удалённые товары выдаются на последней странице.
+    Метка последней страницы отстоит на CATALOG_SYNC_OVERLAP от начала всей синхронизации, а не от последнего
+    выданного товара: изменения, зафиксированные позже во время постраничной выгрузки, попадут в следующую.
+
+    :param changed_since: Дата и время в формате ISO 8601 или метка, выданная предыдущим вызовом
+    :param limit: Максимальное кол-во товаров
+    :return: Изменённые товары, удалённые товары, метка для следующего вызова, признак наличия ещё изменений
+    """
+    keys = ('updated_at', 'id')
+
+    try:
+        position = decode_cursor(changed_since, Product.objects.all(), keys)
+        deleted_since = decode_cursor(changed_since, DeletedProduct.objects.all(), ('deleted_at',))['deleted_at']
+    except ValueError:
+        since = parse_datetime(changed_since)
+
+        if since is None:
+            raise ValueError('Некорректное значение параметра changed_since')
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+
+        position, deleted_since = {'updated_at': since, 'id': 0}, since
+
+    try:
+        # Метки промежуточных страниц несут время начала синхронизации, с метки последней страницы начинается новая
+        started = decode_cursor(changed_since, Product.objects.all(), (), ('started',))['started']
+    except ValueError:
+        started = timezone.now()
+
+    products = list(filter_after_key(Product.objects.all(), keys, position).order_by(*keys)[:limit + 1])
+    has_more = len(products) > limit
+
+    if has_more:
+        products = products[:limit]
+        deleted = []
+        watermark = {'updated_at': products[-1].updated_at, 'id': products[-1].id, 'deleted_at': deleted_since,
+                     'started': started}
+    else:
+        deleted = list(DeletedProduct.objects.filter(deleted_at__gte=deleted_since).order_by('deleted_at'))
+        mark = started - timedelta(seconds=settings.CATALOG_SYNC_OVERLAP)
+        watermark = {'updated_at': mark, 'id': 0, 'deleted_at': mark}
+
+    return products, deleted, encode_cursor(watermark), has_more
+
+
+def create_products_batch_service(items: List[dict]) -> List[dict]:
+    """Пакетное создание товаров
+
+    Ссылки и дубликаты штрих-кодов проверяются по одному запросу на весь пакет,
+    корректные товары и их матрицы создаются массовыми вставками в одной транзакции.
+
+    :param items: Проверенные строки с данными товаров
+    :return: Результат по каждой строке
+    """
+    results = [{'barcode': data['barcode']} for data in items]
+
+    categories = set(Category.objects.filter(id__in={data['category'] for data in items})
+                                     .values_list('id', flat=True))
+    units = set(Unit.objects.filter(id__in={data['unit'] for data in items}).values_list('id', flat=True))
+    matrices = set(ProductMatrix.objects.filter(id__in={pk for data in items for pk in data['matrix']})
+                                        .values_list('id', flat=True))
+    barcodes = set(Product.objects.filter(barcode__in=[data['barcode'] for data in items])
+                                  .values_list('barcode', flat=True))
+
+    slug_length = Product._meta.get_field('slug').max_length
+    slugs = {index: slugify(data['name'])[:slug_length] for index, data in enumerate(items)}
+    fallback_slugs = {index: f"{slugs[index][:slug_length - len(data['barcode']) - 1]}-{data['barcode']}"
+                      for index, data in enumerate(items)}
+    taken_slugs = set(Product.objects.filter(slug__in=[*slugs.values(), *fallback_slugs.values()])
+                                     .values_list('slug', flat=True))
+
+    products = []
+    matrix_ids = []
+
+    for index, data in enumerate(items):
+        errors = {}
+
+        if data['barcode'] in barcodes:
+            errors['barcode'] = ['Товар с таким штрих-кодом уже существует']
+        if data['category'] not in categories:
+            errors['category'] = ['Категория не найдена']
+        if data['unit'] not in units:
+            errors['unit'] = ['Мера исчисления не найдена']
+        if not matrices.issuperset(data['matrix']):
+            errors['matrix'] = ['Матрица товаров не найдена']
+
+        if errors:
+            results[index]['errors'] = errors
+            continue
+
+        slug = slugs[index] if slugs[index] not in taken_slugs else fallback_slugs[index]
+        barcodes.add(data['barcode'])
+        taken_slugs.add(slug)
+
+        products.append(Product(barcode=data['barcode'], name=data['name'], slug=slug, category_id=data['category'],
+                                unit_id=data['unit'], storage_condition=data['storage_condition'],
+                                price=data['price']))
+        matrix_ids.append(set(data['matrix']))
+        results[index]['status'] = 'created'
+
+    if products:
+        with transaction.atomic():
+            Product.objects.bulk_create(products, batch_size=1000)
+            Product.matrix.through.objects.bulk_create(
+                [Product.matrix.through(product_id=product.id, productmatrix_id=matrix_id)
+                 for product, product_matrix_ids in zip(products, matrix_ids) for matrix_id in product_matrix_ids],
+                batch_size=1000
+            )
+            bump_cache_version(CATALOG_VERSION)
+
+        logger.info(f'Пакетно создано товаров: {len(products)}')
+
+    for result in results:
+        result.setdefault('status', 'error')
+
+    return results
+
+
+def apply_price_list_service(items: List[dict], user: User = None) -> Tuple[PriceList, List[str]]:
+    """Загрузка прайс-листа
+
+    Прайс-лист сохраняется как снимок прежних и новых цен, цены товаров обновляются
+    одним запросом в транзакции, версия кэша каталога увеличивается один раз на весь список.
+
+    :param items: Проверенные позиции прайс-листа со штрих-кодом и ценой
+    :param user: Пользователь, загрузивший прайс-лист
+    :return: Прайс-лист и штрих-коды, не найденные в каталоге
+    """
+    prices = {item['barcode']: item['price'] for item in items}
+
+    with transaction.atomic():
+        products = list(Product.objects.select_for_update().filter(barcode__in=prices.keys())
+                                       .values_list('id', 'barcode', 'price'))
+
+        price_list = PriceList.objects.create(user=user, items_count=len(products))
+        PriceListItem.objects.bulk_create(
+            [PriceListItem(price_list=price_list, product_id=product_id, old_price=price, price=prices[barcode])
+             for product_id, barcode, price in products],
+            batch_size=1000
+        )
+
+        changed = [product_id for product_id, barcode, price in products if price != prices[barcode]]
+
+        if changed:
+            new_price = PriceListItem.objects.filter(price_list=price_list, product=OuterRef('pk')).values('price')
+            Product.objects.filter(id__in=changed).update(price=Subquery(new_price[:1]), updated_at=timezone.now())
+            price_list.changed_count = len(changed)
+            price_list.save(update_fields=['changed_count'])
+            bump_cache_version(CATALOG_VERSION)
+
+    found = {barcode for _, barcode, _ in products}
+    logger.info(f'Загружен прайс-лист №{price_list.id}: позиций {len(products)}, изменено цен {len(changed)}')
+
+    return price_list, [barcode for barcode in prices if barcode not in found]
+
+
 def get_user_last_orders_service(user: User, count: int):
     """Получить последние заявки пользователя
 
@@ -80,6 +385,31 @@ def get_user_last_orders_service(user: User, count: int):
     return last_orders
 
 
+def _order_as_nested(root_category: Category, descendants) -> List[Category]:
+    """Упорядочивание вложенных категорий: сначала дочерние категории, затем вложенные в каждую из них
+
+    Порядок совпадает с рекурсивным обходом по уровням, идентификаторы в пути не сравниваются как строки.
+
+    :param root_category: Родительская категория
+    :param descendants: Все вложенные категории
+    :return: Категории
+    """
+    children = defaultdict(list)
+
+    for category in descendants:
+        children[category.root_category_id].append(category)
+
+    def collect(parent_id: int) -> List[Category]:
+        result = list(children[parent_id])
+
+        for child in children[parent_id]:
+            result.extend(collect(child.id))
+
+        return result
+
+    return collect(root_category.id)
+
+
 def get_categories_by_root_category_service(root_category: Category = None, get_nested: bool = False) -> List[Category]:
     """Получение катергорий товаров по родительской категории
 
@@ -87,14 +417,9 @@ def get_categories_by_root_category_service(root_category: Category = None, get_
     :param get_nested: Признак получения всех категорий
     :return: Категории
     """
-    result = []
-
     if get_nested:
         if root_category:
-            categories = Category.objects.filter(root_category=root_category)
-            result.extend(categories)
-            for category in categories:
-                result.extend(get_categories_by_root_category_service(category, True))
+            result = _order_as_nested(root_category, root_category.get_descendants().order_by('id'))
         else:
             result = Category.objects.all()
     else:
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import CATALOG_VERSION, CATEGORIES_VERSION, bump_cache_version
+from .models import Product, Category, Unit, DeletedProduct
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Unit)
+def invalidate_catalog(sender, **kwargs):
+    """ Сигнал для сброса кэша каталога при изменении справочников """
+    bump_cache_version(CATALOG_VERSION)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_categories(sender, **kwargs):
+    """ Сигнал для смены версии дерева категорий """
+    bump_cache_version(CATEGORIES_VERSION)
+
+
+@receiver(post_delete, sender=Product)
+def create_deleted_product(sender, instance, **kwargs):
+    """ Сигнал для сохранения сведений об удалённом товаре """
+    DeletedProduct.objects.create(product_id=instance.id, barcode=instance.barcode)
+
+
+@receiver(m2m_changed, sender=Product.matrix.through)
+def matrix_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Сигнал для сброса кэша каталога и обновления даты изменения товаров при изменении их матриц """
+    if action == 'pre_clear' and reverse:
+        instance._cleared_product_ids = list(instance.product_set.values_list('id', flat=True))
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        product_ids = [instance.id]
+    elif action == 'post_clear':
+        product_ids = getattr(instance, '_cleared_product_ids', [])
+    else:
+        product_ids = pk_set
+
+    Product.objects.filter(id__in=product_ids).update(updated_at=timezone.now())
+    bump_cache_version(CATALOG_VERSION)
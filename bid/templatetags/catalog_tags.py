@@ -0,0 +1,51 @@
+from urllib.parse import quote
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.backends.utils import csrf_input
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+# Метка в кэшированной карточке, вместо которой при выводе подставляется CSRF-токен текущего запроса
+CSRF_PLACEHOLDER = '<!-- csrf_token -->'
+
+
+def _get_card_key(product) -> str:
+    """Ключ кэша карточки товара, меняется при изменении товара, типа или наименования его меры исчисления
+
+    :param product: Товар
+    :return: Ключ кэша
+    """
+    # Наименование меры исчисления выводится в карточке и может содержать пробелы, недопустимые в ключе
+    return f'product_card:{product.id}:{product.updated_at.timestamp()}:{product.unit_id}:{product.unit.type}:' \
+           f'{quote(product.unit.short_name)}'
+
+
+@register.simple_tag(takes_context=True)
+def product_cards(context, products):
+    """Вывод карточек товаров
+
+    Карточки берутся из кэша одним запросом, отсутствующие отрисовываются и сохраняются
+    в кэш, CSRF-токен подставляется для каждого запроса.
+
+    :param context: Контекст шаблона
+    :param products: Товары
+    :return: Разметка карточек
+    """
+    products = list(products)
+    keys = [_get_card_key(product) for product in products]
+    cached = cache.get_many(keys)
+    missing = {}
+
+    for key, product in zip(keys, products):
+        if key not in cached:
+            missing[key] = render_to_string('bid/product/product_card.html', {'product': product})
+
+    if missing:
+        cache.set_many(missing, settings.CATALOG_CACHE_TIMEOUT)
+
+    cards = ''.join(cached.get(key) or missing[key] for key in keys)
+    return mark_safe(cards.replace(CSRF_PLACEHOLDER, csrf_input(context['request'])))
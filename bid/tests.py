@@ -1,9 +1,25 @@
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
 
 from accounts.models import ShopUser
-from .models import Product, Category, Unit, ProductMatrix, Shop, Stock
-from .services import search_products_service, get_product_list_service, get_categories_by_root_category_service
+from .cache import CATALOG_VERSION, get_cache_version
+from .pagination import encode_cursor
+from .paginator import EstimatedCountPaginator
+from .models import Product, Category, Unit, ProductMatrix, Shop, Stock, PriceList
+from .services import (search_products_service, get_product_list_service, get_categories_by_root_category_service,
+                       get_product_page_service, get_search_page_service, suggest_products_service,
+                       get_catalog_changes_service, create_products_batch_service, apply_price_list_service)
 
 
 class BidTestCase(TestCase):
@@ -12,7 +28,7 @@ class BidTestCase(TestCase):
         self.test_category_2 = Category.objects.create(name='Fruits', slug='fruits', root_category=None)
         test_unit_1 = Unit.objects.create(name='Kilograms', short_name='kg.', type=Unit.WEIGHT)
         test_unit_2 = Unit.objects.create(name='Piece', short_name='pc.', type=Unit.PIECE)
-        test_matrix = ProductMatrix.objects.create(name='Small shop')
+        self.test_matrix = test_matrix = ProductMatrix.objects.create(name='Small shop')
         self.test_product_1 = Product.objects.create(barcode='111111111', name='Goat meat', slug='goat-meat',
                                                      unit=test_unit_1, price=3.65, category=test_category_1,
                                                      storage_condition=Product.COOLED)
@@ -42,11 +58,316 @@ class BidTestCase(TestCase):
         self.assertEqual(len(categories), 0)
         self.assertEqual(len(products_list), 1)
 
+    def test_get_product_list_service_nested_category(self):
+        tropical = Category.objects.create(name='Tropical', slug='tropical', root_category=self.test_category_2)
+        exotic = Category.objects.create(name='Exotic', slug='exotic', root_category=tropical)
+        papaya = Product.objects.create(barcode='111111113', name='Papaya', slug='papaya',
+                                        unit=self.test_product_1.unit, price=5.10, category=exotic)
+        papaya.matrix.add(self.test_matrix)
+        Product.objects.create(barcode='111111114', name='Durian', slug='durian',
+                               unit=self.test_product_1.unit, price=9.99, category=exotic)
+
+        category, categories, products_list = get_product_list_service(self.test_user, self.test_category_2.slug)
+        self.assertEqual(len(categories), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(products_list), 2)
+        self.assertIn(papaya, products_list)
+
+    def test_get_product_page_service_cached(self):
+        cache.clear()
+        category, categories, products = get_product_page_service(self.test_user)
+        self.assertEqual(products.paginator.count, 2)
+
+        # Пользователь и товары по идентификаторам, без COUNT; версия каталога берётся из кэша
+        with self.assertNumQueries(2):
+            category, categories, products = get_product_page_service(self.test_user)
+            self.assertEqual(products.paginator.count, 2)
+            self.assertEqual(len(products), 2)
+
+    def test_get_product_page_service_page_normalized(self):
+        cache.clear()
+        get_product_page_service(self.test_user, page='1', per_page=1)
+
+        # "01" и "abc" - это первая страница, она уже в кэше
+        for page in ('01', 'abc'):
+            with self.assertNumQueries(2):
+                category, categories, products = get_product_page_service(self.test_user, page=page, per_page=1)
+            self.assertEqual(products.number, 1)
+
+        category, categories, products = get_product_page_service(self.test_user, page='99', per_page=1)
+        self.assertEqual(products.number, 2)
+
+    def test_get_product_page_service_invalidated(self):
+        cache.clear()
+        get_product_page_service(self.test_user)
+        self.test_product_1.price = 4.20
+        self.test_product_1.save()
+        self.test_product_1.matrix.clear()
+
+        category, categories, products = get_product_page_service(self.test_user)
+        self.assertEqual(products.paginator.count, 1)
+        self.assertNotIn(self.test_product_1, products.object_list)
+
+    @override_settings(CATALOG_SYNC_OVERLAP=0)
+    def test_get_catalog_changes_service(self):
+        products, deleted, watermark, has_more = get_catalog_changes_service('2020-01-01T00:00:00', 1)
+        self.assertEqual(len(products), 1)
+        self.assertTrue(has_more)
+
+        products, deleted, watermark, has_more = get_catalog_changes_service(watermark, 1)
+        self.assertEqual(len(products), 1)
+        self.assertFalse(has_more)
+
+        self.test_product_1.matrix.clear()
+        mango = Product.objects.get(barcode='111111112')
+        mango.delete()
+
+        products, deleted, watermark, has_more = get_catalog_changes_service(watermark, 10)
+        self.assertEqual(products, [self.test_product_1])
+        self.assertEqual([item.barcode for item in deleted], ['111111112'])
+        self.assertRaises(ValueError, get_catalog_changes_service, 'yesterday', 10)
+
+    @override_settings(CATALOG_SYNC_OVERLAP=60)
+    def test_get_catalog_changes_service_long_sync(self):
+        mango = Product.objects.get(barcode='111111112')
+        Product.objects.filter(pk=self.test_product_1.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+        self.test_product_1.refresh_from_db()
+
+        # Синхронизация началась полтора часа назад, первая страница с test_product_1 уже выдана
+        started = timezone.now() - timedelta(minutes=90)
+        cursor = encode_cursor({'updated_at': self.test_product_1.updated_at, 'id': self.test_product_1.id,
+                                'deleted_at': started, 'started': started})
+        products, deleted, watermark, has_more = get_catalog_changes_service(cursor, 10)
+        self.assertEqual(products, [mango])
+        self.assertFalse(has_more)
+
+        # Изменение сделано во время синхронизации, но зафиксировано после выдачи страницы
+        Product.objects.filter(pk=mango.pk).update(updated_at=timezone.now() - timedelta(minutes=30))
+
+        products, deleted, watermark, has_more = get_catalog_changes_service(watermark, 10)
+        self.assertEqual(products, [mango])
+
     def test_search_products_service(self):
         products = search_products_service(self.test_user, 'goat')
         self.assertEqual(len(products), 1)
         self.assertEqual(products[0], self.test_product_1)
 
+    def test_search_products_service_barcode(self):
+        ean = Product.objects.create(barcode='4810000000012', name='Goat cheese', slug='goat-cheese',
+                                     unit=self.test_product_1.unit, price=6.50, category=self.test_category_2)
+        ean.matrix.add(self.test_matrix)
+
+        self.assertEqual(list(search_products_service(self.test_user, '4810000000012')), [ean])
+        self.assertEqual(list(search_products_service(self.test_user, '11111111')),
+                         [self.test_product_1, Product.objects.get(barcode='111111112')])
+        self.assertEqual(len(search_products_service(self.test_user, '4810000000019')), 0)
+
+    @override_settings(SEARCH_RESULTS_LIMIT=3)
+    def test_get_search_page_service_bounded(self):
+        cache.clear()
+        for i in range(5):
+            product = Product.objects.create(barcode=f'22222222{i}', name=f'Goat milk {i}', slug=f'goat-milk-{i}',
+                                             unit=self.test_product_1.unit, price=1.10, category=self.test_category_2)
+            product.matrix.add(self.test_matrix)
+
+        products, truncated = get_search_page_service(self.test_user, 'goat', 1, 2)
+        self.assertTrue(truncated)
+        self.assertEqual(products.paginator.count, 3)
+        self.assertEqual(products.paginator.num_pages, 2)
+        self.assertEqual(len(products), 2)
+
+        # Пользователь и товары страницы по идентификаторам
+        with self.assertNumQueries(2):
+            products, truncated = get_search_page_service(self.test_user, 'goat', 2, 2)
+            self.assertEqual(len(products), 1)
+
+    @override_settings(SEARCH_RESULTS_LIMIT=1)
+    def test_get_search_page_service_exact_limit(self):
+        cache.clear()
+        # Найден ровно один товар: результат полный, не усечённый
+        products, truncated = get_search_page_service(self.test_user, 'goat', 1, 2)
+        self.assertEqual(products.paginator.count, 1)
+        self.assertFalse(truncated)
+
+    def test_search_api_limit(self):
+        client = APIClient()
+        client.force_authenticate(self.test_user)
+
+        self.assertEqual(client.get('/api/v1/bid/products/search', {'q': 'meat', 'limit': 0}).status_code, 422)
+        self.assertEqual(client.get('/api/v1/bid/products/search', {'q': 'meat', 'limit': 1000}).status_code, 200)
+
+    def test_suggest_api_limit(self):
+        client = APIClient()
+        client.force_authenticate(self.test_user)
+
+        self.assertEqual(client.get('/api/v1/bid/products/suggest', {'q': 'meat', 'limit': -1}).status_code, 422)
+        self.assertEqual(client.get('/api/v1/bid/products/suggest', {'q': 'meat', 'limit': 1000}).status_code, 200)
+
+    def test_suggest_products_service(self):
+        meat = Product.objects.create(barcode='111111117', name='Meat balls', slug='meat-balls',
+                                      unit=self.test_product_1.unit, price=2.15, category=self.test_category_2)
+        meat.matrix.add(self.test_matrix)
+
+        suggestions = suggest_products_service(self.test_user, 'mea')
+        self.assertEqual([item['name'] for item in suggestions], ['Meat balls', 'Goat meat'])
+        self.assertEqual(suggestions[0]['unit_name'], 'kg.')
+        self.assertEqual(suggest_products_service(self.test_user, 'me'), [])
+
+        # Полный набор для префикса "mea" уже в кэше, база нужна только для пользователя
+        with self.assertNumQueries(1):
+            suggestions = suggest_products_service(self.test_user, 'meat b')
+        self.assertEqual([item['name'] for item in suggestions], ['Meat balls'])
+
+        self.assertEqual([item['barcode'] for item in suggest_products_service(self.test_user, '1111111', 2)],
+                         ['111111111', '111111112'])
+
+    def test_suggest_products_service_barcode_then_text(self):
+        sour_cream = Product.objects.create(barcode='111111118', name='Сметана 500г', slug='smetana-500g',
+                                            unit=self.test_product_1.unit, price=2.15, category=self.test_category_2)
+        sour_cream.matrix.add(self.test_matrix)
+
+        self.assertEqual(suggest_products_service(self.test_user, '500'), [])
+        self.assertEqual([item['name'] for item in suggest_products_service(self.test_user, '500г')],
+                         ['Сметана 500г'])
+
+    def test_search_products_service_russian_ranked(self):
+        milk = Product.objects.create(barcode='111111115', name='Молоко 3,2%', slug='moloko-3-2',
+                                      unit=self.test_product_1.unit, price=1.75, category=self.test_category_2)
+        chocolate = Product.objects.create(barcode='111111116', name='Шоколад молочный с молоком',
+                                           slug='shokolad-molochnyj', unit=self.test_product_1.unit, price=2.40,
+                                           category=self.test_category_2)
+        milk.matrix.add(self.test_matrix)
+        chocolate.matrix.add(self.test_matrix)
+
+        products = search_products_service(self.test_user, 'молока')
+        self.assertEqual(list(products), [milk, chocolate])
+
+        milk.name = 'Кефир 1%'
+        milk.save()
+        self.assertEqual(list(search_products_service(self.test_user, 'молока')), [chocolate])
+
+    def test_create_products_batch_service(self):
+        unit = self.test_product_1.unit
+        item = {'barcode': '111111120', 'name': 'Goat meat', 'category': self.test_category_2.id, 'unit': unit.id,
+                'matrix': [self.test_matrix.id], 'storage_condition': Product.ORDINARY, 'price': Decimal('4.20')}
+        items = [item,
+                 {**item, 'name': 'Pear'},
+                 {**item, 'barcode': '111111121', 'name': 'Pear', 'unit': 0},
+                 {**item, 'barcode': '111111111'}]
+
+        with self.assertNumQueries(9):
+            results = create_products_batch_service(items)
+
+        self.assertEqual([result['status'] for result in results], ['created', 'error', 'error', 'error'])
+        self.assertIn('unit', results[2]['errors'])
+        self.assertIn('barcode', results[3]['errors'])
+
+        product = Product.objects.get(barcode='111111120')
+        self.assertEqual(product.slug, 'goat-meat-111111120')
+        self.assertEqual(list(product.matrix.all()), [self.test_matrix])
+
+    def test_products_batch_api(self):
+        client = APIClient()
+        client.force_authenticate(self.test_user)
+        item = {'barcode': '111111120', 'name': 'Pear', 'category': self.test_category_2.id,
+                'unit': self.test_product_1.unit.id, 'matrix': [self.test_matrix.id], 'price': '4.20'}
+
+        response = client.post('/api/v1/bid/products/', {'products': [{'barcode': '111111122'}, item]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([(result['index'], result['status']) for result in response.data['products']],
+                         [(0, 'error'), (1, 'created')])
+        self.assertIn('name', response.data['products'][0]['errors'])
+
+        response = client.post('/api/v1/bid/products/', {'products': {'barcode': '111111123'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_apply_price_list_service(self):
+        version = get_cache_version(CATALOG_VERSION)
+        price_list, not_found = apply_price_list_service([{'barcode': '111111111', 'price': Decimal('4.10')},
+                                                          {'barcode': '111111112', 'price': Decimal('77.16')},
+                                                          {'barcode': '999999999', 'price': Decimal('1.00')}],
+                                                         self.test_user)
+
+        self.assertEqual(not_found, ['999999999'])
+        self.assertEqual((price_list.items_count, price_list.changed_count), (2, 1))
+        self.assertEqual(get_cache_version(CATALOG_VERSION), version + 1)
+
+        self.test_product_1.refresh_from_db()
+        self.assertEqual(str(self.test_product_1.price), '4.10')
+        item = price_list.items.get(product=self.test_product_1)
+        self.assertEqual((str(item.old_price), str(item.price)), ('3.65', '4.10'))
+
+    def test_price_list_api(self):
+        client = APIClient()
+        client.force_authenticate(self.test_user)
+
+        response = client.post('/api/v1/bid/products/prices', {'prices': [{'barcode': '111111111', 'price': 'abc'}]},
+                               format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(PriceList.objects.count(), 0)
+
+        response = client.post('/api/v1/bid/products/prices', {'prices': [{'barcode': '111111111', 'price': '4.10'}]},
+                               format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['items_count'], response.data['changed_count']), (1, 1))
+
+    def test_import_catalog_command(self):
+        matrix = ProductMatrix.objects.create(name='Big shop')
+        rows = ['barcode\tname\tunit\tcategory\tprice\tmatrices',
+                f'111111111\tGoat meat chilled\tkg.\tmeat\t3,90\t{matrix.id}',
+                f'111111130\tMango 200g.\tpc.\tfruits\t80.00\t{self.test_matrix.id}|{matrix.id}',
+                f'111111131\tKiwi\tpc.\tunknown\t1.00\t{matrix.id}',
+                f'111111132\tLime\tpc.\tfruits\tnan\t{matrix.id}',
+                f'111111133\tLemon\tpc.\tfruits\tinf\t{matrix.id}',
+                f'111111134\tPear\tpc.\tfruits\t1e40\t{matrix.id}']
+
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False) as file:
+            file.write('\n'.join(rows))
+        self.addCleanup(os.remove, file.name)
+
+        stderr = StringIO()
+        call_command('import_catalog', file.name, workers=1, chunk_size=2, stdout=StringIO(), stderr=stderr)
+
+        for line in (4, 5, 6, 7):
+            self.assertIn(f'Строка {line}', stderr.getvalue())
+        self.test_product_1.refresh_from_db()
+        self.assertEqual(self.test_product_1.name, 'Goat meat chilled')
+        self.assertEqual(list(self.test_product_1.matrix.all()), [matrix])
+
+        mango = Product.objects.get(barcode='111111130')
+        self.assertEqual(mango.slug, 'mango-200g-111111130')
+        self.assertEqual(mango.matrix.count(), 2)
+        self.assertFalse(Product.objects.filter(barcode__in=['111111131', '111111132', '111111133', '111111134'])
+                                .exists())
+
+    def test_estimated_count_paginator(self):
+        self.assertEqual(EstimatedCountPaginator(Product.objects.all(), 1).count, 2)
+        self.assertEqual(EstimatedCountPaginator(Product.objects.filter(name__startswith='Goat'), 1).count, 1)
+
+    def test_product_cards_cached(self):
+        cache.clear()
+        template = Template('{% load catalog_tags %}{% product_cards products %}')
+        products = list(Product.objects.select_related('unit').order_by('id'))
+
+        html = template.render(Context({'products': products, 'request': RequestFactory().get('/')}))
+        self.assertEqual(html.count('csrfmiddlewaretoken'), 2)
+        self.assertIn('step="0.01"', html)
+
+        # Повторный вывод целиком из кэша, с новым CSRF-токеном
+        with self.assertNumQueries(0):
+            cached_html = template.render(Context({'products': products, 'request': RequestFactory().get('/')}))
+        self.assertEqual(cached_html.count('csrfmiddlewaretoken'), 2)
+        self.assertNotEqual(html, cached_html)
+
+        # Переименование меры исчисления не меняет товар, но карточка выводится заново
+        unit = products[0].unit
+        unit.short_name = 'kg'
+        unit.save()
+        html = template.render(Context({'products': list(Product.objects.select_related('unit').order_by('id')),
+                                        'request': RequestFactory().get('/')}))
+        self.assertIn('за kg<', html)
+
 
 class GetCategoriesByRootTestCase(TestCase):
     def setUp(self) -> None:
@@ -54,13 +375,14 @@ class GetCategoriesByRootTestCase(TestCase):
         test_1_1 = Category.objects.create(name='test_1_1', slug='test_1_1', root_category=test_1)
         test_1_2 = Category.objects.create(name='test_1_2', slug='test_1_2', root_category=test_1)
         test_1_2_1 = Category.objects.create(name='test_1_2_1', slug='test_1_2_1', root_category=test_1_2)
-        test_2 = Category.objects.create(name='test_2', slug='test_2', root_category=None)
-        test_2_1 = Category.objects.create(name='test_2_1', slug='test_2_1', root_category=test_2)
+        self.test_2 = Category.objects.create(name='test_2', slug='test_2', root_category=None)
+        test_2_1 = Category.objects.create(name='test_2_1', slug='test_2_1', root_category=self.test_2)
         self.test_3 = Category.objects.create(name='test_3', slug='test_3', root_category=None)
-        test_3_1 = Category.objects.create(name='test_3_1', slug='test_3_1', root_category=self.test_3)
-        test_3_1_1 = Category.objects.create(name='test_3_1_1', slug='test_3_1_1', root_category=test_3_1)
-        test_3_1_1_1 = Category.objects.create(name='test_3_1_1_1', slug='test_3_1_1_1', root_category=test_3_1_1)
-        test_3_2 = Category.objects.create(name='test_3_2', slug='test_3_2', root_category=self.test_3)
+        self.test_3_1 = Category.objects.create(name='test_3_1', slug='test_3_1', root_category=self.test_3)
+        test_3_1_1 = Category.objects.create(name='test_3_1_1', slug='test_3_1_1', root_category=self.test_3_1)
+        self.test_3_1_1_1 = Category.objects.create(name='test_3_1_1_1', slug='test_3_1_1_1',
+                                                    root_category=test_3_1_1)
+        self.test_3_2 = Category.objects.create(name='test_3_2', slug='test_3_2', root_category=self.test_3)
 
     def test_None_True(self):
         result = get_categories_by_root_category_service(None, True)
@@ -77,3 +399,27 @@ class GetCategoriesByRootTestCase(TestCase):
     def test_Value_True(self):
         result = get_categories_by_root_category_service(self.test_3, True)
         self.assertEqual(len(result), 4)
+
+    def test_Value_True_order(self):
+        result = get_categories_by_root_category_service(self.test_3, True)
+        self.assertEqual([category.name for category in result], ['test_3_1', 'test_3_2', 'test_3_1_1', 'test_3_1_1_1'])
+
+    def test_Value_True_single_query(self):
+        with self.assertNumQueries(1):
+            result = list(get_categories_by_root_category_service(self.test_3, True))
+        self.assertEqual(len(result), 4)
+
+    def test_path_and_depth(self):
+        self.assertEqual(self.test_3_1_1_1.depth, 3)
+        self.assertEqual(list(self.test_3_1_1_1.get_ancestors()), [self.test_3, self.test_3_1,
+                                                                    self.test_3_1_1_1.root_category])
+
+    def test_move_subtree(self):
+        self.test_3_1.root_category = self.test_2
+        self.test_3_1.save()
+        self.test_3_1_1_1.refresh_from_db()
+
+        self.assertEqual(self.test_3_1_1_1.depth, 3)
+        self.assertTrue(self.test_3_1_1_1.path.startswith(self.test_2.path))
+        self.assertEqual(len(get_categories_by_root_category_service(self.test_2, True)), 4)
+        self.assertEqual(len(get_categories_by_root_category_service(self.test_3, True)), 1)
@@ -8,7 +8,8 @@ from accounts.forms import LoginForm
 from accounts.models import ShopUser
 from .forms import SearchForm
 from .models import Category
-from .services import get_product_list_service, search_products_service, get_user_last_orders_service
+from .services import (get_product_page_service, get_search_page_service, get_user_last_orders_service,
+                       PRODUCTS_PER_PAGE)
 
 
 def page_not_found_404_view(request, exception):
@@ -34,19 +35,16 @@ def product_list_view(request, category_slug=None):
     """ Просмотр списка товаров """
     category = None
     categories = []
-    products_list = []
+    page = request.GET.get('page')
+    products = Paginator([], PRODUCTS_PER_PAGE).get_page(page)
 
     try:
-        category, categories, products_list = get_product_list_service(request.user, category_slug)
+        category, categories, products = get_product_page_service(request.user, category_slug, page)
     except ShopUser.DoesNotExist:
         messages.error(request, f'Пользователь магазина для {str(request.user)} не найден')
     except Category.DoesNotExist:
         messages.error(request, f'Категория {category_slug} не найдена')
 
-    paginator = Paginator(products_list, 12)
-    page = request.GET.get('page')
-    products = paginator.get_page(page)
-
     context = {
         'category': category,
         'categories': categories,
@@ -72,16 +70,19 @@ def prepare_search_view(request):
 
 def search_results_view(request, word):
     """ Поиск товаров по ключевому слову """
-    search_products = []
+    page = request.GET.get('page')
+    search_products = Paginator([], PRODUCTS_PER_PAGE).get_page(page)
+    truncated = False
 
     try:
-        search_products = search_products_service(request.user, word)
+        search_products, truncated = get_search_page_service(request.user, word, page)
     except ShopUser.DoesNotExist:
         messages.error(request, f'Пользователь магазина для {str(request.user)} не найден')
 
     context = {
         'key_word': word,
-        'products': search_products
+        'products': search_products,
+        'truncated': truncated
     }
 
     return render(request, 'bid/search.html', context)
@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CartItem
+
+
+@admin.register(CartItem)
+class CartItemAdmin(admin.ModelAdmin):
+    list_display = ['user', 'name', 'quantity', 'unit', 'price', 'total', 'updated']
+    list_select_related = ('user__user',)
+    raw_id_fields = ['user', 'product']
+    search_fields = ['name', 'user__user__username']
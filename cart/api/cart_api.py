@@ -0,0 +1,33 @@
+from rest_framework import permissions
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from accounts.models import ShopUser
+from cart.cart import get_cart
+from cart.services import add_products_by_barcodes_service
+from .serializers import CartBarcodeItemSerializer
+
+
+class CartBarcodesApiView(APIView):
+    """ Добавление товаров в корзину по списку штрих-кодов """
+    permission_classes = [permissions.IsAuthenticated, ]
+    parser_classes = (JSONParser,)
+
+    def post(self, request):
+        serializer = CartBarcodeItemSerializer(data=request.data.get('items'), many=True)
+
+        if not serializer.is_valid():
+            return Response({'error': {'head': 'Данные не прошли проверку', 'message': str(serializer.errors)}},
+                            status=400)
+
+        cart = get_cart(request)
+
+        try:
+            added, not_found, invalid = add_products_by_barcodes_service(request.user, cart,
+                                                                         serializer.validated_data)
+        except ShopUser.DoesNotExist:
+            return Response({'error': 'Пользователь магазина не найден'}, status=404)
+
+        return Response({'added': added, 'not_found': not_found, 'invalid': invalid, 'count': len(cart),
+                         'total': cart.get_total_price()}, status=200)
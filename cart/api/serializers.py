@@ -0,0 +1,10 @@
+from decimal import Decimal
+
+from rest_framework import serializers
+
+
+class CartBarcodeItemSerializer(serializers.Serializer):
+    """ Проверка строки добавления товара в корзину по штрих-коду """
+    barcode = serializers.CharField(max_length=13)
+    quantity = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'),
+                                        max_value=Decimal('10000'))
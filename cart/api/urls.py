@@ -0,0 +1,9 @@
+from django.urls import path
+
+from cart.api import cart_api
+
+app_name = 'cart_api'
+
+urlpatterns = [
+    path('barcodes', cart_api.CartBarcodesApiView.as_view()),
+]
@@ -1,19 +1,96 @@
 from decimal import Decimal
+from itertools import islice
 
 from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+from django.utils import timezone
 
+from accounts.models import ShopUser
 from bid.models import Product
+from orders.utils import round_cost
+from .models import CartItem
+
+# Количество строк корзины, выводимых в кратком виде
+PREVIEW_SIZE = 6
+
+
+def _to_minor(value: Decimal) -> int:
+    """Перевод суммы в копейки
+
+    :param value: Сумма
+    :return: Сумма в копейках
+    """
+    return int(round_cost(value) * 100)
+
+
+def _from_minor(value: int) -> Decimal:
+    """Перевод копеек в сумму
+
+    :param value: Сумма в копейках
+    :return: Сумма
+    """
+    return Decimal(value) / 100
 
 
 class Cart:
+    """ Корзина в сессии, используется для анонимных пользователей и при CART_STORAGE = 'session'
+
+    Каждая строка хранит снимок товара (наименование, меру исчисления, цену), поэтому вывод
+    корзины не обращается к базе. Количество строк и итоговая сумма в копейках
+    пересчитываются при каждом изменении и читаются без разбора строк.
+    """
+
     def __init__(self, session):
         self.session = session
         cart = self.session.get(settings.CART_SESSION_ID)
 
         if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
+            cart = self.session[settings.CART_SESSION_ID] = {'items': {}, 'count': 0, 'total': 0}
+        elif 'items' not in cart:
+            cart = self._upgrade(cart)
+
         self.cart = cart
 
+    def _upgrade(self, legacy_cart: dict) -> dict:
+        """Перевод корзины старого формата, где хранились только цена и количество, в формат со снимками товаров
+
+        :param legacy_cart: Корзина старого формата
+        :return: Корзина
+        """
+        cart = {'items': {}, 'count': 0, 'total': 0}
+        products = Product.objects.filter(id__in=legacy_cart.keys()).select_related('unit')
+
+        for product in products:
+            line = legacy_cart[str(product.id)]
+            cart['items'][str(product.id)] = self._make_line(product, Decimal(line['price']),
+                                                             Decimal(line['quantity']))
+
+        cart['count'] = len(cart['items'])
+        cart['total'] = sum(line['total'] for line in cart['items'].values())
+
+        self.session[settings.CART_SESSION_ID] = cart
+        self.session.modified = True
+        return cart
+
+    @staticmethod
+    def _make_line(product: Product, price: Decimal, quantity: Decimal) -> dict:
+        """Строка корзины со снимком товара
+
+        :param product: Товар
+        :param price: Цена
+        :param quantity: Количество
+        :return: Строка корзины
+        """
+        return {
+            'name': product.name,
+            'unit': product.unit.short_name,
+            'is_weight': product.unit.is_weight_type,
+            'price': _to_minor(price),
+            'quantity': str(quantity),
+            'total': _to_minor(price * quantity),
+        }
+
     def add(self, product: Product, quantity: int = 1, update_quantity: bool = False):
         """Метод добавления товара в корзину
 
@@ -22,14 +99,40 @@ class Cart:
         :param update_quantity: Признак обновления
         """
         product_id = str(product.id)
-        if product_id not in self.cart:
-            self.cart[product_id] = {'quantity': str(Decimal(0.0)), 'price': str(product.price)}
-        if update_quantity:
-            self.cart[product_id]['quantity'] = str(quantity)
-        else:
-            self.cart[product_id]['quantity'] = str(Decimal(self.cart[product_id]['quantity']) + Decimal(quantity))
+        quantity = Decimal(str(quantity))
+        line = self.cart['items'].get(product_id)
+
+        if line is None:
+            line = self.cart['items'][product_id] = self._make_line(product, Decimal(str(product.price)), Decimal(0))
+            self.cart['count'] += 1
+
+        if not update_quantity:
+            quantity += Decimal(line['quantity'])
+
+        total = _to_minor(_from_minor(line['price']) * quantity)
+        self.cart['total'] += total - line['total']
+        line['quantity'] = str(quantity)
+        line['total'] = total
         self.save()
 
+    def add_many(self, lines: list, refresh_price: bool = False):
+        """Метод добавления нескольких товаров в корзину
+
+        :param lines: Пары товар - количество
+        :param refresh_price: Признак обновления снимка товара (цены) в строках, которые уже есть в корзине
+        """
+        for product, quantity in lines:
+            line = self.cart['items'].get(str(product.id))
+
+            if refresh_price and line is not None:
+                # Строка пересоздаётся по текущему товару с прежним количеством
+                self.cart['total'] -= line['total']
+                line = self.cart['items'][str(product.id)] = self._make_line(product, Decimal(str(product.price)),
+                                                                             Decimal(line['quantity']))
+                self.cart['total'] += line['total']
+
+            self.add(product, quantity)
+
     def save(self):
         """ Метод сохранения корзины в сессии """
         self.session[settings.CART_SESSION_ID] = self.cart
@@ -40,32 +143,205 @@ class Cart:
 
         :param product: Товар
         """
-        product_id = str(product.id)
-        if product_id in self.cart:
-            del self.cart[product_id]
+        line = self.cart['items'].pop(str(product.id), None)
+
+        if line is not None:
+            self.cart['count'] -= 1
+            self.cart['total'] -= line['total']
             self.save()
 
     def __iter__(self):
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        for product in products:
-            self.cart[str(product.id)]['product'] = product
+        for product_id, line in self.cart['items'].items():
+            yield {
+                'product_id': int(product_id),
+                'name': line['name'],
+                'unit': line['unit'],
+                'is_weight': line['is_weight'],
+                'price': _from_minor(line['price']),
+                'quantity': Decimal(line['quantity']),
+                'total_price': _from_minor(line['total']),
+            }
 
-        for item in self.cart.values():
-            item['price'] = Decimal(item['price'])
-            item['quantity'] = Decimal(item['quantity'])
-            item['total_price'] = round(item['price'] * item['quantity'], 2)
-            yield item
+    @property
+    def preview(self):
+        """ Первые строки корзины для краткого вывода """
+        return list(islice(self, PREVIEW_SIZE))
 
     def __len__(self):
         """ Количество товаров в корзине """
-        return len(self.cart.values())
+        return self.cart['count']
 
     def get_total_price(self):
-        """ Метод рассчёта итого по корзине """
-        return round(sum(Decimal(item['price']) * Decimal(item['quantity']) for item in self.cart.values()), 2)
+        """ Итого по корзине """
+        return _from_minor(self.cart['total'])
 
     def clear(self):
         """ Метод удаления корзины из сессии """
         del self.session[settings.CART_SESSION_ID]
         self.session.modified = True
+
+
+class DatabaseCart:
+    """ Корзина в таблице строк корзины, привязанная к пользователю магазина
+
+    Изменение корзины выполняется одним запросом INSERT ... ON CONFLICT, сессия не меняется.
+    Количество строк и итог считаются одним запросом и запоминаются до следующего изменения.
+    """
+
+    def __init__(self, shop_user: ShopUser):
+        self.shop_user = shop_user
+        self._totals = None
+
+    def _get_items(self):
+        return CartItem.objects.filter(user=self.shop_user)
+
+    def _upsert(self, rows: list, update_quantity: bool, refresh_price: bool = False):
+        """Добавление строк или изменение количества в существующих строках одним запросом
+
+        INSERT ... ON CONFLICT не зависит от наличия строки, поэтому одновременное добавление
+        одного товара (например, двойной клик) не нарушает уникальность пары пользователь - товар.
+
+        :param rows: Тройки идентификатор товара - снимок товара для новой строки - количество
+        :param update_quantity: Признак обновления
+        :param refresh_price: Признак обновления снимка товара (цены) в существующих строках
+        """
+        if not rows:
+            return
+
+        quantity = 'EXCLUDED.quantity' if update_quantity else f'{CartItem._meta.db_table}.quantity + EXCLUDED.quantity'
+        price = 'EXCLUDED.price' if refresh_price else f'{CartItem._meta.db_table}.price'
+        snapshot = 'name = EXCLUDED.name, unit = EXCLUDED.unit, is_weight = EXCLUDED.is_weight, ' \
+                   'price = EXCLUDED.price,' if refresh_price else ''
+        values = []
+        params = []
+        now = timezone.now()
+
+        for product_id, line, row_quantity in rows:
+            values.append('(%s, %s, %s, %s, %s, %s, %s, %s, %s)')
+            params.extend([self.shop_user.id, product_id, line['name'], line['unit'], line['is_weight'], line['price'],
+                           row_quantity, _to_minor(_from_minor(line['price']) * row_quantity), now])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {CartItem._meta.db_table} (user_id, product_id, name, unit, is_weight, price, quantity,
+                                                       total, updated)
+                VALUES {', '.join(values)}
+                ON CONFLICT (user_id, product_id) DO UPDATE
+                SET quantity = {quantity},
+                    total = ROUND({price} * ({quantity})),
+                    {snapshot}
+                    updated = EXCLUDED.updated
+                """,
+                params
+            )
+
+        self._totals = None
+
+    def add(self, product: Product, quantity: int = 1, update_quantity: bool = False):
+        """Метод добавления товара в корзину
+
+        :param product: Товар
+        :param quantity: Количество
+        :param update_quantity: Признак обновления
+        """
+        line = Cart._make_line(product, Decimal(str(product.price)), Decimal(0))
+        self._upsert([(product.id, line, Decimal(str(quantity)))], update_quantity)
+
+    def add_many(self, lines: list, refresh_price: bool = False):
+        """Метод добавления нескольких товаров в корзину одним запросом
+
+        :param lines: Пары товар - количество
+        :param refresh_price: Признак обновления снимка товара (цены) в строках, которые уже есть в корзине
+        """
+        rows = {}
+
+        for product, quantity in lines:
+            # Повтор товара в одном INSERT ... ON CONFLICT недопустим, количества складываются заранее
+            if product.id in rows:
+                rows[product.id][2] += Decimal(str(quantity))
+            else:
+                rows[product.id] = [product.id, Cart._make_line(product, Decimal(str(product.price)), Decimal(0)),
+                                    Decimal(str(quantity))]
+
+        self._upsert(list(rows.values()), False, refresh_price)
+
+    def remove(self, product: Product):
+        """Метод удаление товара из корзины
+
+        :param product: Товар
+        """
+        self._get_items().filter(product=product).delete()
+        self._totals = None
+
+    def merge_session_cart(self, session):
+        """Перенос корзины из сессии, после переноса корзина в сессии удаляется
+
+        :param session: Сессия
+        """
+        session_cart = Cart(session)
+        self._upsert([(int(product_id), line, Decimal(line['quantity']))
+                      for product_id, line in session_cart.cart['items'].items()], False)
+        session_cart.clear()
+
+    @staticmethod
+    def _to_line(item: CartItem) -> dict:
+        return {
+            'product_id': item.product_id,
+            'name': item.name,
+            'unit': item.unit,
+            'is_weight': item.is_weight,
+            'price': _from_minor(item.price),
+            'quantity': item.quantity,
+            'total_price': _from_minor(item.total),
+        }
+
+    def __iter__(self):
+        for item in self._get_items():
+            yield self._to_line(item)
+
+    @property
+    def preview(self):
+        """ Первые строки корзины для краткого вывода, читаются только выводимые строки """
+        return [self._to_line(item) for item in self._get_items()[:PREVIEW_SIZE]] if len(self) else []
+
+    def _get_totals(self) -> dict:
+        if self._totals is None:
+            self._totals = self._get_items().aggregate(count=Count('id'), total=Sum('total'))
+        return self._totals
+
+    def __len__(self):
+        """ Количество товаров в корзине """
+        return self._get_totals()['count']
+
+    def get_total_price(self):
+        """ Итого по корзине """
+        return _from_minor(self._get_totals()['total'] or 0)
+
+    def clear(self):
+        """ Метод удаления корзины """
+        self._get_items().delete()
+        self._totals = None
+
+
+def get_cart(request):
+    """Корзина текущего пользователя в хранилище, заданном настройкой CART_STORAGE
+
+    При хранении в базе корзина есть только у пользователя магазина, корзина из его сессии
+    переносится в таблицу. Остальные пользователи работают с корзиной в сессии.
+
+    :param request: Запрос
+    :return: Корзина
+    """
+    if settings.CART_STORAGE == 'database' and request.user.is_authenticated:
+        shop_user = ShopUser.objects.filter(user=request.user).first()
+
+        if shop_user is not None:
+            cart = DatabaseCart(shop_user)
+
+            if settings.CART_SESSION_ID in request.session:
+                cart.merge_session_cart(request.session)
+
+            return cart
+
+    return Cart(request.session)
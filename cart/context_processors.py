@@ -1,5 +1,8 @@
-from .cart import Cart
+from django.utils.functional import SimpleLazyObject
+
+from .cart import get_cart
 
 
 def cart(request):
-    return {'cart': Cart(request.session)}
+    # Корзина создаётся только если шаблон к ней обращается
+    return {'cart': SimpleLazyObject(lambda: get_cart(request))}
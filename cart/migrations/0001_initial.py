@@ -0,0 +1,38 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('bid', '0008_price_list'),
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150, verbose_name='Наименование товара')),
+                ('unit', models.CharField(max_length=10, verbose_name='Мера исчисления')),
+                ('is_weight', models.BooleanField(default=False, verbose_name='Весовой товар')),
+                ('price', models.PositiveIntegerField(verbose_name='Цена, коп.')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Количество')),
+                ('total', models.PositiveIntegerField(verbose_name='Стоимость, коп.')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bid.Product', verbose_name='Товар')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to='accounts.ShopUser', verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Строка корзины',
+                'verbose_name_plural': 'Строки корзины',
+                'ordering': ('id',),
+                'unique_together': {('user', 'product')},
+            },
+        ),
+    ]
@@ -1,3 +1,27 @@
 from django.db import models
 
-# Create your models here.
+from accounts.models import ShopUser
+from bid.models import Product
+
+
+class CartItem(models.Model):
+    """ Модель строки корзины пользователя магазина со снимком товара """
+    user = models.ForeignKey(ShopUser, verbose_name='Пользователь', on_delete=models.CASCADE,
+                             related_name='cart_items')
+    product = models.ForeignKey(Product, verbose_name='Товар', on_delete=models.CASCADE, related_name='+')
+    name = models.CharField("Наименование товара", max_length=150)
+    unit = models.CharField("Мера исчисления", max_length=10)
+    is_weight = models.BooleanField("Весовой товар", default=False)
+    price = models.PositiveIntegerField("Цена, коп.")
+    quantity = models.DecimalField("Количество", max_digits=10, decimal_places=2)
+    total = models.PositiveIntegerField("Стоимость, коп.")
+    updated = models.DateTimeField("Дата изменения", auto_now=True)
+
+    class Meta:
+        verbose_name = 'Строка корзины'
+        verbose_name_plural = 'Строки корзины'
+        unique_together = ('user', 'product')
+        ordering = ('id',)
+
+    def __str__(self):
+        return self.name
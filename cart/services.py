@@ -0,0 +1,58 @@
+import logging
+from decimal import Decimal
+from typing import List, Tuple, Union
+
+from django.contrib.auth.models import User
+
+from accounts.models import ShopUser
+from bid.models import Product
+from .cart import Cart, DatabaseCart
+
+logger = logging.getLogger(__name__)
+
+
+def add_products_by_barcodes_service(user: User, cart: Union[Cart, DatabaseCart],
+                                     items: List[dict]) -> Tuple[List[str], List[str], List[dict]]:
+    """Добавление в корзину списка товаров по штрих-кодам
+
+    Товары ищутся одним запросом в матрице магазина пользователя, количество проверяется
+    по типу меры исчисления, все найденные строки добавляются в корзину разом.
+
+    :param user: Пользователь
+    :param cart: Корзина
+    :param items: Строки со штрих-кодом и количеством
+    :return: Добавленные штрих-коды, ненайденные штрих-коды, строки с некорректным количеством
+    """
+    try:
+        shop_user = ShopUser.objects.select_related('shop').get(user=user)
+    except ShopUser.DoesNotExist:
+        logger.error(f'Пользователь магазина для {str(user)} не найден')
+        raise
+
+    quantities = {}
+
+    for item in items:
+        quantities[item['barcode']] = quantities.get(item['barcode'], Decimal(0)) + item['quantity']
+
+    products = []
+
+    if shop_user.shop is not None:
+        products = Product.objects.filter(matrix=shop_user.shop.product_matrix_id, barcode__in=quantities.keys()) \
+                                  .select_related('unit')
+
+    lines = []
+    invalid = []
+
+    for product in products:
+        quantity = quantities[product.barcode]
+
+        if not product.unit.is_weight_type and quantity != quantity.to_integral_value():
+            invalid.append({'barcode': product.barcode, 'error': 'Штучный товар добавляется целым количеством'})
+        else:
+            lines.append((product, quantity))
+
+    cart.add_many(lines)
+
+    found = {product.barcode for product in products}
+    return [product.barcode for product, _ in lines], [barcode for barcode in quantities if barcode not in found], \
+        invalid
@@ -1,9 +1,14 @@
 from decimal import Decimal
 
+from django.conf import settings
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-from bid.models import Category, Unit, Product, ProductMatrix
-from .cart import Cart
+from accounts.models import ShopUser
+from bid.models import Category, Unit, Product, ProductMatrix, Shop, Stock
+from .cart import Cart, DatabaseCart
+from .models import CartItem
 
 
 class CartTestCase(TestCase):
@@ -12,7 +17,7 @@ class CartTestCase(TestCase):
         test_category = Category.objects.create(name='Meat', slug='meat', root_category=None)
         test_unit_1 = Unit.objects.create(name='Kilograms', short_name='kg.', type=Unit.WEIGHT)
         test_unit_2 = Unit.objects.create(name='Piece', short_name='pc.', type=Unit.PIECE)
-        test_matrix = ProductMatrix.objects.create(name='Small shop')
+        test_matrix = self.test_matrix = ProductMatrix.objects.create(name='Small shop')
         self.test_product_1 = Product.objects.create(barcode='111111111', name='Goat meat', slug='goat-meat',
                                                      unit=test_unit_1, price=3.65, category=test_category,
                                                      storage_condition=Product.COOLED)
@@ -37,3 +42,103 @@ class CartTestCase(TestCase):
     def test_get_total_price(self):
         self.assertEqual(self.cart.get_total_price(), round(Decimal(7.30),2))
 
+
+    def test_cart_totals_incremental(self):
+        self.cart.add(self.test_product_2, 3)
+        self.cart.add(self.test_product_1, Decimal('0.5'))
+        self.assertEqual(self.cart.get_total_price(), Decimal('240.61'))
+
+        self.cart.add(self.test_product_2, 1, update_quantity=True)
+        self.cart.remove(self.test_product_1)
+        self.assertEqual((len(self.cart), self.cart.get_total_price()), (1, Decimal('77.16')))
+
+    def test_cart_iteration_without_queries(self):
+        with self.assertNumQueries(0):
+            items = list(Cart(self.cart.session))
+
+        self.assertEqual(items[0]['name'], 'Goat meat')
+        self.assertEqual(items[0]['unit'], 'kg.')
+        self.assertTrue(items[0]['is_weight'])
+        self.assertEqual(items[0]['total_price'], Decimal('7.30'))
+
+    def test_legacy_cart_upgrade(self):
+        session = self.client.session
+        session[settings.CART_SESSION_ID] = {str(self.test_product_2.id): {'quantity': '2', 'price': '70.00'}}
+
+        cart = Cart(session)
+        self.assertEqual((len(cart), cart.get_total_price()), (1, Decimal('140.00')))
+        self.assertEqual(list(cart)[0]['name'], 'Koala meat 200g.')
+
+    def test_database_cart(self):
+        shop_user = ShopUser.objects.create(user=User.objects.create_user('john', 'lennon@thebeatles.com', 'pass'))
+        cart = DatabaseCart(shop_user)
+        cart.merge_session_cart(self.cart.session)
+        cart.add(self.test_product_1, 1)
+        cart.add(self.test_product_2, 3)
+        cart.add(self.test_product_2, 2, update_quantity=True)
+
+        self.assertEqual(CartItem.objects.filter(user=shop_user).count(), 2)
+        self.assertNotIn(settings.CART_SESSION_ID, self.cart.session)
+        with self.assertNumQueries(1):
+            self.assertEqual((len(cart), cart.get_total_price()), (2, Decimal('165.27')))
+
+        cart.remove(self.test_product_1)
+        self.assertEqual([item['name'] for item in cart], ['Koala meat 200g.'])
+
+    def test_database_cart_upsert_and_preview(self):
+        shop_user = ShopUser.objects.create(user=User.objects.create_user('john', 'lennon@thebeatles.com', 'pass'))
+        first, second = DatabaseCart(shop_user), DatabaseCart(shop_user)
+
+        # Обе корзины добавляют товар, которого ещё нет в таблице: вторая вставка становится обновлением
+        with self.assertNumQueries(1):
+            first.add(self.test_product_2, 1)
+        second.add(self.test_product_2, 2)
+        second.add_many([(self.test_product_1, Decimal('0.5')), (self.test_product_1, Decimal('0.5'))])
+
+        item = CartItem.objects.get(user=shop_user, product=self.test_product_2)
+        self.assertEqual((item.quantity, item.total), (3, 23148))
+        self.assertEqual(CartItem.objects.get(user=shop_user, product=self.test_product_1).total, 365)
+
+        for number in range(10):
+            product = Product.objects.create(barcode=f'2222222{number:02d}', name=f'Product {number}',
+                                             slug=f'product-{number}', unit=self.test_product_2.unit, price=1,
+                                             category=self.test_product_2.category)
+            CartItem.objects.create(user=shop_user, product=product, name=product.name, unit='pc.', is_weight=False,
+                                    price=100, quantity=1, total=100)
+
+        cart = DatabaseCart(shop_user)
+        with self.assertNumQueries(2):
+            preview = cart.preview
+        self.assertEqual(len(preview), 6)
+
+    def test_api_add_by_barcodes(self):
+        user = User.objects.create_user('john', 'lennon@thebeatles.com', 'pass')
+        shop = Shop.objects.create(address='Test address', product_matrix=self.test_matrix,
+                                   stock=Stock.objects.create(name='Test stock', stock_type=Stock.ORDINARY))
+        shop_user = ShopUser.objects.create(user=user, shop=shop)
+        CartItem.objects.create(user=shop_user, product=self.test_product_2, name='Koala meat 200g.', unit='pc.',
+                                is_weight=False, price=7716, quantity=1, total=7716)
+        Product.objects.create(barcode='111111113', name='Other shop meat', slug='other-shop-meat',
+                               unit=self.test_product_1.unit, price=1, category=self.test_product_1.category,
+                               storage_condition=Product.COOLED)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post('/api/v1/cart/barcodes', {'items': [
+            {'barcode': '111111111', 'quantity': '1.25'},
+            {'barcode': '111111112', 'quantity': '2'},
+            {'barcode': '111111113', 'quantity': '1'},
+            {'barcode': '111111111', 'quantity': '0.25'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['added']), ['111111111', '111111112'])
+        self.assertEqual(response.data['not_found'], ['111111113'])
+        self.assertEqual((response.data['count'], response.data['total']), (2, Decimal('236.96')))
+
+        response = client.post('/api/v1/cart/barcodes', {'items': [{'barcode': '111111112', 'quantity': '0.5'}]},
+                               format='json')
+        self.assertEqual(response.data['invalid'][0]['barcode'], '111111112')
+        self.assertEqual(CartItem.objects.get(product=self.test_product_2).quantity, 3)
+
+        response = client.post('/api/v1/cart/barcodes', {'items': [{'barcode': '111111111'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
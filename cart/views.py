@@ -4,7 +4,7 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 
 from bid.models import Product
-from .cart import Cart
+from .cart import get_cart
 from .forms import CartAddProductForm
 
 
@@ -12,7 +12,7 @@ from .forms import CartAddProductForm
 @permission_required('orders.add_order')
 def cart_add_view(request, product_id: int):
     """ Добавление товара в корзину """
-    cart = Cart(request.session)
+    cart = get_cart(request)
     product = get_object_or_404(Product, id=product_id)
     form = CartAddProductForm(request.POST, is_weight_type=product.unit.is_weight_type)
 
@@ -25,7 +25,7 @@ def cart_add_view(request, product_id: int):
 
 def cart_remove_view(request, product_id: int):
     """ Удаление товара из корзины """
-    cart = Cart(request.session)
+    cart = get_cart(request)
     product = get_object_or_404(Product, id=product_id)
     cart.remove(product)
     return redirect('cart:cart_detail')
@@ -33,7 +33,7 @@ def cart_remove_view(request, product_id: int):
 
 def clear_cart_view(request):
     """ Очистка корзины """
-    cart = Cart(request.session)
+    cart = get_cart(request)
     cart.clear()
     return redirect('cart:cart_detail')
 
@@ -41,10 +41,11 @@ def clear_cart_view(request):
 @login_required()
 def cart_detail_view(request):
     """ Просмотр корзины """
-    cart = Cart(request.session)
-    for item in cart:
+    cart = get_cart(request)
+    items = list(cart)
+    for item in items:
         item['update_quantity_form'] = CartAddProductForm(
             initial={'quantity': item['quantity'], 'update': True},
-            is_weight_type=item.get('product').unit.is_weight_type
+            is_weight_type=item['is_weight']
         )
-    return render(request, 'cart/detail.html', {'cart': cart})
+    return render(request, 'cart/detail.html', {'cart': cart, 'items': items})
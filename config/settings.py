@@ -23,15 +23,18 @@ INSTALLED_APPS = [
     'accounts.apps.AccountsConfig',
     'orders.apps.OrdersConfig',
     'cart.apps.CartConfig',
+    'monitoring.apps.MonitoringConfig',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'monitoring.middleware.RequestProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -108,6 +111,30 @@ CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 CART_SESSION_ID = 'cart'
 
+# Хранилище корзины пользователей магазинов: 'database' - таблица строк корзины, 'session' - сессия
+CART_STORAGE = 'database'
+
+# Время жизни кэша страниц каталога, сек. Ключи также сбрасываются при изменении версии каталога
+# Версии каталога хранятся в том же кэше, поэтому при нескольких процессах кэш должен быть общим (Memcached, Redis)
+CATALOG_CACHE_TIMEOUT = 60 * 15
+
+# Максимальное количество товаров в результатах поиска
+SEARCH_RESULTS_LIMIT = 240
+
+# Перекрытие, сек., с которым выдаётся метка синхронизации каталога, отсчитывается от начала синхронизации:
+# изменения из ещё не завершённых транзакций попадут в следующую выгрузку
+CATALOG_SYNC_OVERLAP = 60
+
+# Учёт SQL-запросов и времени обработки каждого запроса. Запросы сверх бюджета пишутся в журнал мониторинга
+REQUEST_METRICS_ENABLED = False
+REQUEST_METRICS_QUERY_BUDGET = 50
+# Бюджет времени обработки запроса, мс
+REQUEST_METRICS_TIME_BUDGET = 500
+
+# Профилирование запроса сотрудником по параметру ?profile или заголовку X-Profile
+REQUEST_PROFILING_ENABLED = False
+REQUEST_PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -149,6 +176,12 @@ LOGGING = {
             'filename': os.path.join(BASE_DIR, 'logs', 'bid', f'{datetime.today().date()}.log'),
             'formatter': 'verbose',
         },
+        'monitoring_file': {
+            'level': 'INFO',
+            'class': 'logging.FileHandler',
+            'filename': os.path.join(BASE_DIR, 'logs', 'monitoring', f'{datetime.today().date()}.log'),
+            'formatter': 'verbose',
+        },
     },
     'loggers': {
         'django': {
@@ -163,6 +196,10 @@ LOGGING = {
         'bid': {
             'handlers': ['bid_file'],
             'level': 'INFO',
+        },
+        'monitoring': {
+            'handlers': ['monitoring_file'],
+            'level': 'INFO',
         }
     },
 }
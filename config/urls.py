@@ -19,6 +19,7 @@ urlpatterns = [
         ])),
         path('orders/', include('orders.api.urls')),
         path('bid/', include('bid.api.urls')),
+        path('cart/', include('cart.api.urls')),
     ]))
 ]
 
@@ -0,0 +1,47 @@
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['created', 'view_name', 'method', 'path', 'user', 'status_code', 'duration', 'queries_count',
+                    'queries_duration', 'display_downloads']
+    list_filter = ('view_name', 'created')
+    list_select_related = ('user',)
+    search_fields = ['path', 'view_name', 'user__username']
+    exclude = ['profile_file', 'sql_file']
+    readonly_fields = ['created', 'user', 'method', 'path', 'view_name', 'status_code', 'duration', 'queries_count',
+                       'queries_duration', 'display_downloads']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/<str:kind>/', self.admin_site.admin_view(self.download_view),
+                 name='monitoring_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk, kind):
+        """ Выгрузка файла профиля или SQL-запросов """
+        if kind not in ('profile', 'sql') or not self.has_view_permission(request):
+            raise Http404
+
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        file = profile.profile_file if kind == 'profile' else profile.sql_file
+        return FileResponse(file.open('rb'), as_attachment=True, filename=file.name)
+
+    def display_downloads(self, obj):
+        return format_html('<a href="{}">профиль</a> | <a href="{}">SQL</a>',
+                           reverse('admin:monitoring_requestprofile_download', args=[obj.pk, 'profile']),
+                           reverse('admin:monitoring_requestprofile_download', args=[obj.pk, 'sql']))
+
+    display_downloads.short_description = 'Файлы'
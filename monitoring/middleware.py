@@ -0,0 +1,205 @@
+import cProfile
+import logging
+import marshal
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMetrics:
+    """ Обёртка выполнения SQL-запросов, считающая их количество и время """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class QueryLog(QueryMetrics):
+    """ Обёртка выполнения SQL-запросов, дополнительно сохраняющая их текст и время """
+
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+
+        try:
+            return super().__call__(execute, sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - started, sql, params))
+
+    def to_text(self) -> str:
+        """Текст выполненных запросов с их временем
+
+        :return: Текст
+        """
+        return '\n\n'.join(f'-- {duration * 1000:.3f} ms, params: {params!r}\n{sql};'
+                             for duration, sql, params in self.queries)
+
+
+def get_view_name(request) -> str:
+    """Наименование представления, обработавшего запрос
+
+    :param request: Запрос
+    :return: Имя функции или класса представления
+    """
+    match = getattr(request, 'resolver_match', None)
+
+    if match is None:
+        return '-'
+
+    view = getattr(match.func, 'view_class', match.func)
+    return getattr(view, '__name__', match.view_name)
+
+
+class RequestMetricsMiddleware:
+    """ Учёт количества SQL-запросов, времени работы с базой и общего времени обработки запроса
+
+    Включается настройкой REQUEST_METRICS_ENABLED. Запросы, превысившие
+    REQUEST_METRICS_QUERY_BUDGET или REQUEST_METRICS_TIME_BUDGET, пишутся в журнал
+    с уровнем WARNING, метрики каждого ответа передаются в заголовке Server-Timing.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.query_budget = settings.REQUEST_METRICS_QUERY_BUDGET
+        self.time_budget = settings.REQUEST_METRICS_TIME_BUDGET
+
+    def __call__(self, request):
+        metrics = QueryMetrics()
+        started = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+
+            response = self.get_response(request)
+
+        total_time = (time.perf_counter() - started) * 1000
+        db_time = metrics.duration * 1000
+        view_name = get_view_name(request)
+
+        response['Server-Timing'] = f'db;dur={db_time:.1f};desc="{metrics.count} queries", ' \
+                                    f'total;dur={total_time:.1f}'
+
+        message = f'{request.method} {request.path} view={view_name} status={response.status_code} ' \
+                  f'queries={metrics.count} db_ms={db_time:.1f} total_ms={total_time:.1f}'
+
+        if metrics.count > self.query_budget or total_time > self.time_budget:
+            logger.warning(f'Превышен бюджет запроса: {message}')
+        else:
+            logger.debug(message)
+
+        return response
+
+
+class RequestProfilingMiddleware:
+    """ Профилирование запроса по требованию сотрудника
+
+    Включается настройкой REQUEST_PROFILING_ENABLED, запускается параметром ?profile
+    или заголовком X-Profile. Профиль cProfile и выполненные SQL-запросы сохраняются
+    в REQUEST_PROFILE_DIR и доступны в разделе администрирования. Запросы без признака
+    профилирования проходят без дополнительной работы.
+    """
+    query_param = 'profile'
+    header = 'HTTP_X_PROFILE'
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if self.query_param not in request.GET and self.header not in request.META:
+            return self.get_response(request)
+
+        user = self._get_staff_user(request)
+
+        if user is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        query_log = QueryLog()
+        started = time.perf_counter()
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_log))
+
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+
+        duration = (time.perf_counter() - started) * 1000
+        self._save_profile(request, response, user, profiler, query_log, duration)
+
+        return response
+
+    @staticmethod
+    def _get_staff_user(request):
+        """Сотрудник, запросивший профилирование, по сессии или JWT-токену
+
+        :param request: Запрос
+        :return: Пользователь или None
+        """
+        user = getattr(request, 'user', None)
+
+        if user is None or not user.is_authenticated:
+            try:
+                authenticated = JWTAuthentication().authenticate(request)
+            except AuthenticationFailed:
+                authenticated = None
+            user = authenticated[0] if authenticated else None
+
+        return user if user is not None and user.is_staff else None
+
+    @staticmethod
+    def _save_profile(request, response, user, profiler, query_log: QueryLog, duration: float) -> None:
+        """Сохранение профиля и SQL-запросов
+
+        :param request: Запрос
+        :param response: Ответ
+        :param user: Пользователь
+        :param profiler: Профилировщик
+        :param query_log: Выполненные SQL-запросы
+        :param duration: Время выполнения, мс
+        """
+        profiler.create_stats()
+        view_name = get_view_name(request)
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{view_name}'
+
+        profile = RequestProfile(user=user, method=request.method, path=request.path[:255], view_name=view_name,
+                                 status_code=response.status_code, duration=duration,
+                                 queries_count=query_log.count, queries_duration=query_log.duration * 1000)
+        profile.profile_file.save(f'{name}.prof', ContentFile(marshal.dumps(profiler.stats)), save=False)
+        profile.sql_file.save(f'{name}.sql', ContentFile(query_log.to_text().encode()), save=False)
+        profile.save()
+
+        logger.info(f'Сохранён профиль запроса {profile} пользователя {user}: {duration:.1f} мс, '
+                    f'SQL-запросов {query_log.count}')
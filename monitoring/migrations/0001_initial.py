@@ -0,0 +1,40 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import monitoring.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата создания')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.CharField(max_length=255, verbose_name='Адрес')),
+                ('view_name', models.CharField(max_length=150, verbose_name='Представление')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Код ответа')),
+                ('duration', models.FloatField(verbose_name='Время выполнения, мс')),
+                ('queries_count', models.PositiveIntegerField(verbose_name='Количество SQL-запросов')),
+                ('queries_duration', models.FloatField(verbose_name='Время SQL-запросов, мс')),
+                ('profile_file', models.FileField(storage=monitoring.models.ProfileStorage(), upload_to='', verbose_name='Профиль cProfile')),
+                ('sql_file', models.FileField(storage=monitoring.models.ProfileStorage(), upload_to='', verbose_name='SQL-запросы')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
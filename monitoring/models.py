@@ -0,0 +1,43 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ProfileStorage(FileSystemStorage):
+    """ Хранилище файлов профилирования в каталоге REQUEST_PROFILE_DIR """
+
+    @property
+    def base_location(self):
+        return settings.REQUEST_PROFILE_DIR
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+class RequestProfile(models.Model):
+    """ Модель профиля выполнения запроса """
+    created = models.DateTimeField("Дата создания", auto_now_add=True, db_index=True)
+    user = models.ForeignKey(User, verbose_name='Пользователь', on_delete=models.SET_NULL, null=True, blank=True)
+    method = models.CharField("Метод", max_length=10)
+    path = models.CharField("Адрес", max_length=255)
+    view_name = models.CharField("Представление", max_length=150)
+    status_code = models.PositiveSmallIntegerField("Код ответа")
+    duration = models.FloatField("Время выполнения, мс")
+    queries_count = models.PositiveIntegerField("Количество SQL-запросов")
+    queries_duration = models.FloatField("Время SQL-запросов, мс")
+    profile_file = models.FileField("Профиль cProfile", storage=ProfileStorage())
+    sql_file = models.FileField("SQL-запросы", storage=ProfileStorage())
+
+    class Meta:
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+        ordering = ('-created',)
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.view_name})'
@@ -0,0 +1,59 @@
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bid.models import Category
+from .models import RequestProfile
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_QUERY_BUDGET=0, REQUEST_METRICS_TIME_BUDGET=10000)
+class RequestMetricsMiddlewareTestCase(TestCase):
+    def setUp(self) -> None:
+        Category.objects.create(name='Meat', slug='meat', root_category=None)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword'))
+
+    def test_over_budget_request_logged(self):
+        with self.assertLogs('monitoring', 'WARNING') as logs:
+            response = self.client.get('/api/v1/bid/categories/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('view=CategoriesApiView', logs.output[0])
+        self.assertTrue(response['Server-Timing'].startswith('db;dur='))
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get('/api/v1/bid/categories/')
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class RequestProfilingMiddlewareTestCase(TestCase):
+    def setUp(self) -> None:
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        profiling_settings = self.settings(REQUEST_PROFILING_ENABLED=True, REQUEST_PROFILE_DIR=self.profile_dir)
+        profiling_settings.enable()
+        self.addCleanup(profiling_settings.disable)
+        self.staff = User.objects.create_superuser('admin', 'admin@thebeatles.com', 'adminpassword')
+        self.user = User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword')
+
+    def get(self, user, **extra):
+        token = RefreshToken.for_user(user).access_token
+        return APIClient().get('/api/v1/bid/categories/', HTTP_AUTHORIZATION=f'Bearer {token}', **extra)
+
+    def test_staff_request_profiled(self):
+        self.assertEqual(self.get(self.staff, HTTP_X_PROFILE='1').status_code, 200)
+        self.get(self.user, HTTP_X_PROFILE='1')
+        self.get(self.staff)
+
+        profile = RequestProfile.objects.get()
+        self.assertEqual((profile.user, profile.view_name), (self.staff, 'CategoriesApiView'))
+        self.assertIn('bid_category', profile.sql_file.read().decode())
+
+        self.client.force_login(self.staff)
+        response = self.client.get(f'/admin/monitoring/requestprofile/{profile.id}/download/profile/')
+        self.assertEqual(response.status_code, 200)
@@ -1,11 +1,25 @@
 import nested_admin
 from django.contrib import admin
+from django.db.models import Prefetch
+from nested_admin.formsets import NestedInlineFormSet
 
+from bid.paginator import EstimatedCountPaginator
 from .models import Order, OrderItem, Container
 
 
+class ContainerInlineFormSet(NestedInlineFormSet):
+    """ Формы контейнеров строки заявки из контейнеров, загруженных вместе со строками """
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset') and 'containers' in getattr(self.instance, '_prefetched_objects_cache', {}):
+            self._queryset = self.instance.containers.all()
+
+        return super().get_queryset()
+
+
 class ContainerInline(nested_admin.NestedStackedInline):
     model = Container
+    formset = ContainerInlineFormSet
     extra = 2
 
 
@@ -15,10 +29,18 @@ class OrderItemInline(nested_admin.NestedStackedInline):
     inlines = [ContainerInline]
     extra = 2
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product__unit') \
+                                            .prefetch_related(Prefetch('containers', Container.objects.order_by('id')))
+
 
 @admin.register(Order)
 class OrderAdmin(nested_admin.NestedModelAdmin):
-    list_display = ['id', 'status', 'user', 'created', 'assembled', 'shipped', 'get_total_cost']
+    list_display = ['id', 'status', 'user', 'created', 'assembled', 'shipped', 'items_count', 'total_cost']
     list_filter = ['status', 'created', 'assembled', 'shipped']
     list_editable = ['status']
+    list_select_related = ('user__user',)
+    readonly_fields = ['total_cost', 'items_count', 'weight_items_count']
     inlines = [OrderItemInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1,13 +1,19 @@
 from django.core.paginator import Paginator, EmptyPage
+from django.db.models import Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import permissions
 from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.serializers import ValidationError
 from rest_framework.views import APIView
 
+from accounts.models import ShopUser
+from bid.pagination import paginate_by_cursor
+from cart.cart import get_cart
 from orders.exceptions import InvalidOrderStatusException, NotNewOrderStatusException
 from orders.models import Order
-from orders.services.order_services import get_orders_by_status
+from orders.services.order_services import get_orders_by_status, repeat_order_service
 from .serializers import OrderSerializer
 
 
@@ -35,6 +41,18 @@ class OrdersAPIView(APIView):
             else:
                 orders = Order.objects.all()
 
+            orders = OrderSerializer.setup_eager_loading(orders)
+
+            if 'cursor' in request.query_params:
+                try:
+                    orders_page, next_cursor = paginate_by_cursor(orders, request.query_params['cursor'], limit,
+                                                                  keys=('created', 'id'))
+                except ValueError as err:
+                    return Response({'error': str(err)}, status=422)
+
+                serializer = OrderSerializer(orders_page, many=True)
+                return Response({'orders': serializer.data, 'next': next_cursor}, status=200)
+
             paginator = Paginator(orders, limit)
 
             try:
@@ -49,6 +67,23 @@ class OrdersAPIView(APIView):
         return Response({'orders': serializer.data}, status=200)
 
 
+def _order_last_modified(request, pk):
+    """ Дата изменения заявки или её товаров для условных запросов, вычисляется один раз на запрос """
+    if not hasattr(request, '_order_last_modified'):
+        dates = Order.objects.filter(pk=pk).annotate(products_updated=Max('items__product__updated_at')) \
+                                           .order_by().values_list('updated', 'products_updated').first()
+        request._order_last_modified = max(date for date in dates if date is not None) if dates else None
+
+    return request._order_last_modified
+
+
+def _order_etag(request, pk):
+    """ ETag заявки, учитывает изменения в пределах секунды """
+    updated = _order_last_modified(request, pk)
+    return f'order-{pk}-{updated.timestamp()}' if updated else None
+
+
+@method_decorator(condition(etag_func=_order_etag, last_modified_func=_order_last_modified), name='get')
 class OrderApiView(APIView):
     """ Заявка """
     permission_classes = [permissions.IsAuthenticated, ]
@@ -56,7 +91,7 @@ class OrderApiView(APIView):
 
     def get(self, request, pk):
         try:
-            serializer = OrderSerializer(Order.objects.get(pk=pk))
+            serializer = OrderSerializer(OrderSerializer.setup_eager_loading(Order.objects.all()).get(pk=pk))
             return Response({'order': serializer.data}, status=200)
         except Order.DoesNotExist:
             return Response({'error': 'Заявка не найдена'}, status=404)
@@ -76,3 +111,22 @@ class OrderApiView(APIView):
             return Response({'error': 'Данные не прошли проверку'}, status=400)
         except NotNewOrderStatusException as err:
             return Response({'error': str(err)}, status=400)
+
+
+class OrderRepeatApiView(APIView):
+    """ Повтор заявки: перенос строк заявки в корзину """
+    permission_classes = [permissions.IsAuthenticated, ]
+    parser_classes = (JSONParser,)
+
+    def post(self, request, pk):
+        cart = get_cart(request)
+
+        try:
+            added, skipped = repeat_order_service(request.user, pk, cart)
+        except ShopUser.DoesNotExist:
+            return Response({'error': 'Пользователь магазина не найден'}, status=404)
+        except Order.DoesNotExist:
+            return Response({'error': 'Заявка не найдена'}, status=404)
+
+        return Response({'added': added, 'skipped': skipped, 'count': len(cart), 'total': cart.get_total_price()},
+                        status=200)
@@ -1,20 +1,25 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 
 from accounts.api.serializers import ShopUserSerializer
-from bid.api.serializers import ProductSerializer
+from bid.api.serializers import EagerLoadingMixin, ProductSerializer
 from orders.exceptions import NotNewOrderStatusException
 from orders.models import Order, OrderItem
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """Сериальзация заявки"""
+    select_related_fields = ('user__user',)
+    prefetch_related_fields = (Prefetch('items', queryset=OrderItem.objects.select_related('product')),
+                               'items__product__matrix')
     user = ShopUserSerializer()
     order_items = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
-        fields = ('id', 'user', 'created', 'get_total_cost', 'status', 'order_items')
-        read_only_fields = ('id', 'created')
+        fields = ('id', 'user', 'created', 'get_total_cost', 'total_cost', 'items_count', 'weight_items_count',
+                  'status', 'order_items')
+        read_only_fields = ('id', 'created', 'total_cost', 'items_count', 'weight_items_count')
 
     def update(self, instance, validated_data):
         """ Обновление статуса """
@@ -26,12 +31,15 @@ class OrderSerializer(serializers.ModelSerializer):
         return instance
 
     def get_order_items(self, instance):
-        order_items = instance.items.all()
+        # Строки уже загружены вместе с заявкой, список не порождает новой выборки
+        order_items = list(instance.items.all())
         return OrderItemSerializer(order_items, many=True).data
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """Сериализация строк заявки"""
+    select_related_fields = ('product',)
+    prefetch_related_fields = ('product__matrix',)
     product = ProductSerializer()
 
     class Meta:
@@ -7,4 +7,5 @@ app_name = 'orders_api'
 urlpatterns = [
     path('by_status', orders_api.OrdersAPIView.as_view()),
     path('<int:pk>', orders_api.OrderApiView.as_view()),
+    path('<int:pk>/repeat', orders_api.OrderRepeatApiView.as_view()),
 ]
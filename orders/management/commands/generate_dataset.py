@@ -0,0 +1,219 @@
+import logging
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import ShopUser
+from bid.cache import CATALOG_VERSION, CATEGORIES_VERSION, bump_cache_version
+from bid.models import Category, Product, ProductMatrix, Shop, Stock, Unit
+from orders.models import Container, Order, OrderItem
+from orders.utils import round_cost
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+PRODUCT_NAMES = ('Молоко', 'Кефир', 'Сыр', 'Творог', 'Хлеб', 'Батон', 'Колбаса', 'Сосиски', 'Ветчина', 'Шоколад',
+                 'Печенье', 'Сок', 'Чай', 'Кофе', 'Масло', 'Йогурт', 'Сметана', 'Мука', 'Рис', 'Гречка', 'Макароны',
+                 'Яблоки', 'Бананы', 'Картофель', 'Морковь', 'Курица', 'Свинина', 'Говядина', 'Рыба', 'Конфеты')
+PRODUCT_KINDS = ('домашний', 'классический', 'отборный', 'фермерский', 'детский', 'деревенский', 'молочный',
+                 'копчёный', 'свежий', 'традиционный', 'премиум', 'диетический')
+
+
+class Command(BaseCommand):
+    help = 'Генерация синтетического набора данных: магазины, матрицы, дерево категорий, товары и заявки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=50, help='Количество магазинов')
+        parser.add_argument('--matrices', type=int, default=5, help='Количество матриц товаров')
+        parser.add_argument('--category-depth', type=int, default=4, help='Глубина дерева категорий')
+        parser.add_argument('--category-width', type=int, default=5, help='Количество подкатегорий на уровне')
+        parser.add_argument('--products', type=int, default=100000, help='Количество товаров')
+        parser.add_argument('--days', type=int, default=90, help='Количество дней истории заявок')
+        parser.add_argument('--orders-per-day', type=int, default=50, help='Количество заявок в день')
+        parser.add_argument('--items-per-order', type=int, default=20, help='Среднее количество строк заявки')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора случайных чисел')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        # Метка набора, чтобы повторная генерация не конфликтовала с уже созданными данными
+        self.label = timezone.now().strftime('%Y%m%d%H%M%S')
+
+        with transaction.atomic():
+            units = self._create_units()
+            matrices = self._create_matrices(options['matrices'])
+            categories = self._create_categories(options['category_depth'], options['category_width'])
+            products = self._create_products(options['products'], units, categories, matrices)
+            shop_users = self._create_shops(options['shops'], matrices)
+            orders = self._create_orders(shop_users, products, options['days'], options['orders_per_day'],
+                                         options['items_per_order'])
+
+            bump_cache_version(CATALOG_VERSION)
+            bump_cache_version(CATEGORIES_VERSION)
+
+        message = f'Создано матриц: {len(matrices)}, категорий: {len(categories)}, ' \
+                  f'товаров: {sum(len(ids) for ids in products.values())} (с учётом матриц), ' \
+                  f'магазинов: {len(shop_users)}, заявок: {orders}'
+        logger.info(f'Сгенерирован набор данных. {message}')
+        self.stdout.write(self.style.SUCCESS(message))
+
+    @staticmethod
+    def _create_units() -> list:
+        """Меры исчисления: весовая и штучная
+
+        :return: Меры исчисления
+        """
+        weight, _ = Unit.objects.get_or_create(short_name='кг.', type=Unit.WEIGHT, defaults={'name': 'Килограмм'})
+        piece, _ = Unit.objects.get_or_create(short_name='шт.', type=Unit.PIECE, defaults={'name': 'Штука'})
+        return [weight, piece]
+
+    def _create_matrices(self, count: int) -> list:
+        """Матрицы товаров
+
+        :param count: Количество
+        :return: Матрицы товаров
+        """
+        return ProductMatrix.objects.bulk_create(
+            [ProductMatrix(name=f'Матрица {self.label}-{number}') for number in range(count)]
+        )
+
+    def _create_categories(self, depth: int, width: int) -> list:
+        """Дерево категорий, товары привязываются к листьям
+
+        :param depth: Глубина дерева
+        :param width: Количество подкатегорий на уровне
+        :return: Категории-листья
+        """
+        level = [None]
+
+        for level_number in range(depth):
+            children = []
+
+            for parent in level:
+                for number in range(width):
+                    slug = f'bench-{self.label}-{parent.id if parent else 0}-{level_number}-{number}'
+                    children.append(Category.objects.create(name=f'Категория {level_number}.{number}', slug=slug,
+                                                            root_category=parent))
+            level = children
+
+        return level
+
+    def _create_products(self, count: int, units: list, categories: list, matrices: list) -> dict:
+        """Товары с привязкой к матрицам
+
+        :param count: Количество
+        :param units: Меры исчисления
+        :param categories: Категории
+        :param matrices: Матрицы товаров
+        :return: Идентификаторы и цены товаров по идентификатору матрицы
+        """
+        offset = Product.objects.count()
+        products_by_matrix = {matrix.id: [] for matrix in matrices}
+
+        for start in range(0, count, BATCH_SIZE):
+            batch = []
+
+            for number in range(start, min(start + BATCH_SIZE, count)):
+                barcode = f'2{offset + number:012d}'
+                name = f'{self.random.choice(PRODUCT_NAMES)} {self.random.choice(PRODUCT_KINDS)} {number}'
+                batch.append(Product(barcode=barcode, name=name, slug=f'bench-{barcode}',
+                                     unit=self.random.choice(units), category=self.random.choice(categories),
+                                     price=Decimal(self.random.randint(10, 100000)) / 100,
+                                     storage_condition=self.random.choice(Product.STORAGE_CONDITION)[0]))
+
+            Product.objects.bulk_create(batch)
+            links = []
+
+            for product in batch:
+                for matrix in self.random.sample(matrices, self.random.randint(1, len(matrices))):
+                    links.append(Product.matrix.through(product_id=product.id, productmatrix_id=matrix.id))
+                    products_by_matrix[matrix.id].append((product.id, product.price, product.unit.is_weight_type))
+
+            Product.matrix.through.objects.bulk_create(links)
+
+        return products_by_matrix
+
+    def _create_shops(self, count: int, matrices: list) -> list:
+        """Магазины с пользователями
+
+        :param count: Количество
+        :param matrices: Матрицы товаров
+        :return: Пользователи магазинов
+        """
+        stock = Stock.objects.create(name=f'Склад {self.label}')
+        shops = [Shop.objects.create(name=f'Магазин {self.label}-{number}', address=f'Адрес {number}',
+                                     product_matrix=self.random.choice(matrices), stock=stock)
+                 for number in range(count)]
+
+        password = make_password(None)
+        users = User.objects.bulk_create(
+            [User(username=f'bench-{self.label}-{number}', first_name='Товаровед', last_name=str(number),
+                  password=password) for number in range(count)]
+        )
+        # Идентификаторы пользователей после bulk_create известны только для PostgreSQL
+        return ShopUser.objects.bulk_create([ShopUser(user=user, shop=shop) for user, shop in zip(users, shops)])
+
+    def _create_orders(self, shop_users: list, products: dict, days: int, per_day: int, items_per_order: int) -> int:
+        """Заявки со строками и контейнерами за указанное количество дней
+
+        :param shop_users: Пользователи магазинов
+        :param products: Товары по идентификатору матрицы
+        :param days: Количество дней
+        :param per_day: Заявок в день
+        :param items_per_order: Среднее количество строк
+        :return: Количество заявок
+        """
+        now = timezone.now()
+
+        for day in range(days, -1, -1):
+            created = now - timedelta(days=day)
+            status = Order.SHIPPED if day > 1 else self.random.choice((Order.NEW, Order.PROCESSED, Order.ASSEMBLED))
+            users = [self.random.choice(shop_users) for _ in range(per_day)]
+
+            orders = []
+            order_lines = []
+
+            for user in users:
+                matrix_products = products[user.shop.product_matrix_id]
+                count = min(len(matrix_products), max(1, int(self.random.gauss(items_per_order, 5))))
+                lines = []
+
+                for product_id, price, is_weight in self.random.sample(matrix_products, count):
+                    quantity = Decimal(self.random.randint(10, 2000)) / 100 if is_weight else self.random.randint(1, 20)
+                    lines.append((product_id, price, quantity, is_weight))
+
+                # Строки добавляются без сигналов, поэтому итоги заявки заполняются сразу
+                orders.append(Order(user=user, status=status, items_count=len(lines),
+                                    weight_items_count=sum(1 for line in lines if line[3]),
+                                    total_cost=sum(round_cost(price * quantity) for _, price, quantity, _ in lines)))
+                order_lines.append(lines)
+
+            orders = Order.objects.bulk_create(orders)
+            # Дата создания заполняется автоматически, поэтому переносится в прошлое отдельным запросом
+            Order.objects.filter(id__in=[order.id for order in orders]).update(
+                created=created, updated=created,
+                assembled=created if status in (Order.ASSEMBLED, Order.SHIPPED) else None,
+                shipped=created if status == Order.SHIPPED else None
+            )
+
+            items = [OrderItem(order=order, product_id=product_id, price=price, quantity=quantity,
+                               packed=status != Order.NEW or not is_weight)
+                     for order, lines in zip(orders, order_lines)
+                     for product_id, price, quantity, is_weight in lines]
+
+            OrderItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+
+            if status in (Order.ASSEMBLED, Order.SHIPPED):
+                Container.objects.bulk_create(
+                    [Container(order_item=item, number=str(self.random.randint(1, 500)), quantity=item.quantity)
+                     for item in items],
+                    batch_size=BATCH_SIZE
+                )
+
+        return (days + 1) * per_day
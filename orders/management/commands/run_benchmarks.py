@@ -0,0 +1,143 @@
+import json
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import ShopUser
+from bid.models import Category, Product
+from bid.services import get_product_list_service, search_products_service
+from cart.cart import Cart
+from monitoring.middleware import QueryMetrics
+from orders.api.orders_api import OrdersAPIView
+from orders.models import Order
+from orders.services.container_services import set_container_to_order_service
+from orders.services.order_services import create_order_service
+
+SEARCH_WORDS = ('молоко', 'сыр домашний', 'шоколад', '2000000')
+
+
+class Command(BaseCommand):
+    help = 'Замер времени и количества SQL-запросов основных сценариев, результат в формате JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Количество повторов каждого замера')
+        parser.add_argument('--cart-size', type=int, default=20, help='Количество товаров в корзине заявки')
+        parser.add_argument('--user', help='Имя пользователя магазина, по умолчанию первый с магазином')
+        parser.add_argument('--output', help='Файл результата, по умолчанию стандартный вывод')
+
+    def handle(self, *args, **options):
+        shop_users = ShopUser.objects.select_related('user', 'shop').filter(shop__isnull=False)
+
+        if options['user']:
+            shop_users = shop_users.filter(user__username=options['user'])
+
+        shop_user = shop_users.order_by('id').first()
+
+        if shop_user is None:
+            raise CommandError('Не найден пользователь магазина, сначала выполните generate_dataset')
+
+        self.repeat = options['repeat']
+        user = shop_user.user
+        products = list(Product.objects.filter(matrix=shop_user.shop.product_matrix_id)
+                                       .select_related('unit')[:options['cart_size']])
+        category = Category.objects.filter(root_category__isnull=True).order_by('id').first()
+        order = Order.objects.filter(status=Order.PROCESSED).order_by('-created').first()
+
+        results = [
+            self._measure('get_product_list_service',
+                          lambda: list(get_product_list_service(user)[2][:100])),
+            self._measure('get_product_list_service[category]',
+                          lambda: list(get_product_list_service(user, category.slug)[2][:100]) if category else None),
+            *[self._measure(f'search_products_service[{word}]',
+                            lambda word=word: list(search_products_service(user, word)[:50]))
+              for word in SEARCH_WORDS],
+            self._measure('create_order_service', lambda: self._create_order(user, products), rollback=True),
+            self._measure('Order.orders_for_packer', lambda: list(Order.orders_for_packer.all()[:100])),
+            self._measure('Order.orders_for_sorter', lambda: list(Order.orders_for_sorter.all()[:100])),
+            self._measure('set_container_to_order_service',
+                          lambda: set_container_to_order_service(order.id, 1) if order else None, rollback=True),
+            self._measure('OrdersAPIView', lambda: self._call_orders_api(user)),
+        ]
+
+        report = json.dumps({
+            'created': timezone.now().isoformat(),
+            'dataset': {
+                'products': Product.objects.count(),
+                'categories': Category.objects.count(),
+                'orders': Order.objects.count(),
+            },
+            'repeat': self.repeat,
+            'results': results,
+        }, ensure_ascii=False, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+
+    def _measure(self, name: str, func, rollback: bool = False) -> dict:
+        """Замер сценария
+
+        :param name: Наименование сценария
+        :param func: Сценарий
+        :param rollback: Откатывать изменения в базе после каждого повтора
+        :return: Время в мс и количество запросов
+        """
+        timings = []
+        metrics = QueryMetrics()
+
+        for _ in range(self.repeat):
+            with ExitStack() as stack:
+                if rollback:
+                    stack.enter_context(transaction.atomic())
+
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+
+                started = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - started) * 1000)
+
+                if rollback:
+                    transaction.set_rollback(True)
+
+        return {
+            'name': name,
+            'min_ms': round(min(timings), 3),
+            'median_ms': round(statistics.median(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'db_ms': round(metrics.duration * 1000 / self.repeat, 3),
+            'queries': metrics.count // self.repeat,
+        }
+
+    @staticmethod
+    def _create_order(user, products: list) -> Order:
+        """Создание заявки из корзины с указанными товарами
+
+        :param user: Пользователь
+        :param products: Товары
+        :return: Заявка
+        """
+        cart = Cart(SessionStore())
+
+        for product in products:
+            cart.add(product, 1)
+
+        return create_order_service(user, cart)
+
+    @staticmethod
+    def _call_orders_api(user) -> None:
+        """Запрос первой страницы заявок через API
+
+        :param user: Пользователь
+        """
+        request = APIRequestFactory().get('/api/v1/orders/by_status', {'status': Order.PROCESSED, 'limit': 50})
+        force_authenticate(request, user=user)
+        OrdersAPIView.as_view()(request).render()
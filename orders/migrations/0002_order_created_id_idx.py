@@ -0,0 +1,17 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created', 'id'], name='orders_orde_created_dcc729_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunSQL(
+            'UPDATE orders_order SET updated = COALESCE(shipped, assembled, created);',
+            migrations.RunSQL.noop,
+        ),
+    ]
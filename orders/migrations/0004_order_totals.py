@@ -0,0 +1,44 @@
+# Generated by Django 2.2.18 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество строк'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Итого'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='weight_items_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество строк с весовым товаром'),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE orders_order SET total_cost = totals.total_cost, items_count = totals.items_count,
+                                    weight_items_count = totals.weight_items_count
+            FROM (
+                SELECT item.order_id, SUM(ROUND(item.price * item.quantity, 2)) AS total_cost,
+                       COUNT(*) AS items_count, COUNT(*) FILTER (WHERE unit.type = 'W') AS weight_items_count
+                FROM orders_orderitem item
+                JOIN bid_product product ON product.id = item.product_id
+                JOIN bid_unit unit ON unit.id = product.unit_id
+                GROUP BY item.order_id
+            ) totals
+            WHERE orders_order.id = totals.order_id;
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
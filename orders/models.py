@@ -1,10 +1,12 @@
+from decimal import Decimal
+
 from django.db import models
 from django.urls import reverse
 from django.db.models import Count, Q
 
 from accounts.models import ShopUser
 from bid.models import Product, Unit
-from .utils import get_today_process_bid_datetime
+from .utils import get_today_process_bid_datetime, round_cost
 
 
 class PackerOrderManager(models.Manager):
@@ -15,8 +17,9 @@ class PackerOrderManager(models.Manager):
 
         weight_units = Unit.objects.filter(type=Unit.WEIGHT)
         items = Count('items', filter=Q(items__product__unit__in=weight_units, items__packed=False))
-        return super().get_queryset().annotate(items_count=items).filter(status=Order.PROCESSED, created__lte=date,
-                                                                         items_count__gt=0)
+        return super().get_queryset().annotate(unpacked_items_count=items).filter(
+            status=Order.PROCESSED, created__lte=date, unpacked_items_count__gt=0
+        )
 
 
 class SorterOrderManager(models.Manager):
@@ -36,6 +39,11 @@ class Order(models.Model):
     created = models.DateTimeField("Дата создания", auto_now_add=True)
     assembled = models.DateTimeField("Дата комплектовки", null=True, blank=True)
     shipped = models.DateTimeField("Дата отгрузки", null=True, blank=True)
+    updated = models.DateTimeField("Дата изменения", auto_now=True)
+    # Итоги заявки пересчитываются при изменении строк, списки заявок не загружают строки
+    total_cost = models.DecimalField("Итого", max_digits=12, decimal_places=2, default=0)
+    items_count = models.PositiveIntegerField("Количество строк", default=0)
+    weight_items_count = models.PositiveIntegerField("Количество строк с весовым товаром", default=0)
 
     NEW = 'N'
     PROCESSED = 'P'
@@ -65,9 +73,10 @@ class Order(models.Model):
         ordering = ('-created',)
         verbose_name = 'Заявка'
         verbose_name_plural = 'Заявки'
+        indexes = [models.Index(fields=['created', 'id'])]
 
     def get_total_cost(self):
-        return round(sum(item.get_cost() for item in self.items.all()), 2)
+        return self.total_cost
 
     def get_items_for_packer(self):
         """ Получение только весового неупаковонного товара для упаковщика """
@@ -112,7 +121,7 @@ class OrderItem(models.Model):
 
     def get_cost(self):
         """ Стоимость """
-        return round(self.price * self.quantity, 2)
+        return round_cost(Decimal(str(self.price)) * Decimal(str(self.quantity)))
 
     def get_total_quantity_in_containers(self):
         """ Количество товара в контейнерах """
@@ -1,14 +1,17 @@
 import itertools
 import logging
-from typing import List
+from typing import List, Tuple, Union
 
 from django.contrib.auth.models import User
 from django.db import transaction, Error
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 
-from cart.cart import Cart
+from bid.models import Product
+from cart.cart import Cart, DatabaseCart
 from orders.exceptions import NotSortedException, CartIsEmptyException, InvalidOrderStatusException
 from orders.models import ShopUser, Order, OrderItem
+from orders.utils import round_cost
 
 logger = logging.getLogger(__name__)
 
@@ -116,15 +119,18 @@ def _change_order_item_packed_state(order_item: OrderItem, packed_state: bool) -
     order_item.save(update_fields=['packed'])
 
 
-def create_order_service(user: User, cart: Cart) -> Order:
+def create_order_service(user: User, cart: Union[Cart, DatabaseCart]) -> Order:
     """Создание заявки
 
+    Товары корзины с мерами исчисления читаются одним запросом, строки заявки добавляются одной вставкой,
+    поэтому число запросов не зависит от размера корзины.
+
     :param user: Пользователь
     :param cart: Корзина
     :return: Заявка
     """
     try:
-        shop_user = ShopUser.objects.get(user=user)
+        shop_user = ShopUser.objects.select_related('user').get(user=user)
     except ShopUser.DoesNotExist:
         logger.error(f'Пользователь магазина для {str(user)} не найден')
         raise
@@ -132,17 +138,31 @@ def create_order_service(user: User, cart: Cart) -> Order:
     if len(cart) == 0:
         raise CartIsEmptyException
 
+    lines = list(cart)
+    products = Product.objects.select_related('unit').in_bulk([line['product_id'] for line in lines])
+    missing = [line['name'] for line in lines if line['product_id'] not in products]
+
+    if missing:
+        logger.warning(f'Товары {", ".join(missing)} удалены из каталога и не включены в заявку')
+
+    lines = [line for line in lines if line['product_id'] in products]
+    weight_lines = [line for line in lines if products[line['product_id']].unit.is_weight_type]
+    # Строки добавляются одной вставкой без сигналов, поэтому итоги заявки заполняются сразу
+    total_cost = sum(round_cost(line['price'] * line['quantity']) for line in lines)
+
     try:
         with transaction.atomic():
-            order = Order.objects.create(user=shop_user)
-
-            for item in cart:
-                OrderItem.objects.create(
+            order = Order.objects.create(user=shop_user, total_cost=total_cost, items_count=len(lines),
+                                         weight_items_count=len(weight_lines))
+            OrderItem.objects.bulk_create([
+                OrderItem(
                     order=order,
-                    product=item['product'],
-                    price=item['price'],
-                    quantity=item['quantity'],
-                    packed=not item['product'].unit.is_weight_type)
+                    product_id=line['product_id'],
+                    price=line['price'],
+                    quantity=line['quantity'],
+                    packed=not products[line['product_id']].unit.is_weight_type)
+                for line in lines
+            ])
 
         logger.info(f'{str(order)} была создана пользователем {shop_user}')
         cart.clear()
@@ -151,3 +171,39 @@ def create_order_service(user: User, cart: Cart) -> Order:
         raise
 
     return order
+
+
+def repeat_order_service(user: User, order_id: int, cart: Union[Cart, DatabaseCart]) -> Tuple[int, List[str]]:
+    """Повтор заявки: перенос строк ранее созданной заявки в корзину
+
+    Строки заявки с товарами и признаком наличия товара в матрице магазина читаются одним запросом,
+    товары добавляются в корзину по текущей цене. Товары, выведенные из матрицы магазина, пропускаются.
+
+    :param user: Пользователь
+    :param order_id: Идентификатор заявки
+    :param cart: Корзина
+    :return: Количество добавленных строк, наименования пропущенных товаров
+    """
+    try:
+        shop_user = ShopUser.objects.select_related('shop').get(user=user)
+    except ShopUser.DoesNotExist:
+        logger.error(f'Пользователь магазина для {str(user)} не найден')
+        raise
+
+    matrix_id = shop_user.shop.product_matrix_id if shop_user.shop is not None else None
+    in_matrix = Product.matrix.through.objects.filter(product_id=OuterRef('product_id'), productmatrix_id=matrix_id)
+    items = list(OrderItem.objects.filter(order_id=order_id, order__user=shop_user)
+                                  .select_related('product__unit')
+                                  .annotate(in_matrix=Exists(in_matrix)))
+
+    if not items and not Order.objects.filter(id=order_id, user=shop_user).exists():
+        logger.error(f'Заявки с идентификатором {str(order_id)} пользователя {shop_user} не существует')
+        raise Order.DoesNotExist
+
+    lines = [(item.product, item.quantity) for item in items if item.in_matrix]
+    # Строки, которые уже есть в корзине, переводятся на текущую цену
+    cart.add_many(lines, refresh_price=True)
+
+    skipped = [item.product.name for item in items if not item.in_matrix]
+    logger.info(f'Заявка №{str(order_id)} повторена пользователем {shop_user}, пропущено товаров: {len(skipped)}')
+    return len(lines), skipped
@@ -1,8 +1,10 @@
+from django.db.models import Count, DecimalField, F, Func, Q, Sum, Value
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import Container, Order
+from bid.models import Unit
+from .models import Container, Order, OrderItem
 
 
 @receiver([post_save, post_delete], sender=Container)
@@ -17,4 +19,21 @@ def update_assembled(sender, instance, **kwargs):
         order.status = Order.PROCESSED
         order.assembled = None
 
-    order.save(update_fields=['status', 'assembled'])
+    order.save(update_fields=['status', 'assembled', 'updated'])
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def update_order_totals(sender, instance, **kwargs):
+    """ Сигнал для пересчёта итогов и обновления даты изменения заявки при изменении её строк """
+    cost = Func(F('price') * F('quantity'), Value(2), function='ROUND',
+                output_field=DecimalField(max_digits=12, decimal_places=2))
+    totals = OrderItem.objects.filter(order_id=instance.order_id).aggregate(
+        total_cost=Sum(cost),
+        items_count=Count('id'),
+        weight_items_count=Count('id', filter=Q(product__unit__type=Unit.WEIGHT))
+    )
+
+    Order.objects.filter(id=instance.order_id).update(total_cost=totals['total_cost'] or 0,
+                                                      items_count=totals['items_count'],
+                                                      weight_items_count=totals['weight_items_count'],
+                                                      updated=timezone.now())
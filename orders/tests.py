@@ -1,13 +1,23 @@
+import json
+from decimal import Decimal
+from io import StringIO
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
 
 from accounts.models import ShopUser
-from bid.models import Product, Category, Unit, ProductMatrix
-from cart.cart import Cart
+from bid.pagination import paginate_by_cursor
+from bid.models import Product, Category, Unit, ProductMatrix, Shop, Stock
+from cart.cart import Cart, DatabaseCart
+from cart.models import CartItem
+from .api.serializers import OrderSerializer
 from .exceptions import NotPackedException
 from .models import Order, OrderItem, Container
 from .services.order_services import (set_order_as_shipped_service, set_order_as_packed_service,
-                                      set_order_item_as_packed_service, create_order_service)
+                                      set_order_item_as_packed_service, create_order_service,
+                                      repeat_order_service)
 from .services.container_services import (set_container_to_order_item_service, set_container_to_order_service)
 
 
@@ -17,7 +27,7 @@ class OrderTestCase(TestCase):
         test_category = Category.objects.create(name='Meat', slug='meat', root_category=None)
         test_unit_1 = Unit.objects.create(name='Kilograms', short_name='kg.', type=Unit.WEIGHT)
         test_unit_2 = Unit.objects.create(name='Piece', short_name='pc.', type=Unit.PIECE)
-        test_matrix = ProductMatrix.objects.create(name='Small shop')
+        test_matrix = self.test_matrix = ProductMatrix.objects.create(name='Small shop')
         self.test_product_1 = Product.objects.create(barcode='111111111', name='Goat meat', slug='goat-meat',
                                                      unit=test_unit_1, price=3.65, category=test_category,
                                                      storage_condition=Product.COOLED)
@@ -30,7 +40,7 @@ class OrderTestCase(TestCase):
 
         # Создание пользователя
         self.test_user = User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword')
-        test_shop_user = ShopUser.objects.create(user=self.test_user, phone=None)
+        self.test_shop_user = test_shop_user = ShopUser.objects.create(user=self.test_user, phone=None)
 
         # Создание заявки
         self.test_order_1 = Order.objects.create(user=test_shop_user)
@@ -74,6 +84,142 @@ class OrderTestCase(TestCase):
         self.assertEqual(Order.objects.count(), 2)
         self.assertEqual(OrderItem.objects.count(), 3)
 
+    def test_create_order_service_fixed_queries(self):
+        cart = Cart(self.client.session)
+        cart.add(self.test_product_1, 2)
+        cart.add(self.test_product_2, 3)
+
+        # Пользователь, товары, транзакция, заявка и строки заявки
+        with self.assertNumQueries(6):
+            order = create_order_service(self.test_user, cart)
+
+        self.assertEqual(list(order.items.order_by('id').values_list('packed', flat=True)), [False, True])
+        self.assertEqual((order.total_cost, order.items_count, order.weight_items_count), (Decimal('238.78'), 2, 1))
+
+    def test_order_totals_follow_items(self):
+        self.test_order_1.refresh_from_db()
+        self.assertEqual((self.test_order_1.total_cost, self.test_order_1.items_count,
+                          self.test_order_1.weight_items_count), (Decimal('160.96'), 2, 1))
+
+        self.test_order_item_2.delete()
+        self.test_order_1.refresh_from_db()
+        self.assertEqual((self.test_order_1.total_cost, self.test_order_1.items_count,
+                          self.test_order_1.weight_items_count), (Decimal('6.64'), 1, 1))
+
+    def test_order_totals_rounding_matches_lines_and_cart(self):
+        # 3.65 * 0.5 = 1.825: строка, итог заявки и корзина округляются одинаково
+        cart = Cart(self.client.session)
+        cart.add(self.test_product_1, Decimal('0.5'))
+        self.assertEqual(cart.get_total_price(), Decimal('1.83'))
+
+        order = create_order_service(self.test_user, cart)
+        item = order.items.get()
+        self.assertEqual((item.get_cost(), order.total_cost), (Decimal('1.83'), Decimal('1.83')))
+
+        item.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total_cost, Decimal('1.83'))
+
     def test_set_container_to_order_service_order_exception(self):
         self.assertRaises(Order.DoesNotExist, set_container_to_order_service,
                           self.test_order_item_1.id + 10, 1)
+
+    def test_paginate_by_cursor(self):
+        for _ in range(4):
+            Order.objects.create(user=self.test_shop_user)
+
+        seen, cursor = [], ''
+        while True:
+            orders, cursor = paginate_by_cursor(Order.objects.all(), cursor, 2, keys=('created', 'id'))
+            seen.extend(order.id for order in orders)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, list(Order.objects.order_by('created', 'id').values_list('id', flat=True)))
+        self.assertRaises(ValueError, paginate_by_cursor, Order.objects.all(), 'not-a-cursor', 2)
+
+    def test_order_serializer_fixed_queries(self):
+        with self.assertNumQueries(3):
+            data = OrderSerializer(Order.objects.all(), many=True).data
+        self.assertEqual(len(data[0]['order_items']), 2)
+
+        for _ in range(3):
+            order = Order.objects.create(user=self.test_shop_user)
+            OrderItem.objects.create(order=order, product=self.test_product_2, price=self.test_product_2.price,
+                                     quantity=1)
+
+        with self.assertNumQueries(3):
+            data = OrderSerializer(Order.objects.all(), many=True).data
+        self.assertEqual(data[-1]['order_items'][0]['product']['matrix'], [self.test_product_1.matrix.get().id])
+
+    def test_order_api_conditional_get(self):
+        client = APIClient()
+        client.force_authenticate(self.test_user)
+        url = f'/api/v1/orders/{self.test_order_id}'
+
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(1):
+            response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        etag = response['ETag']
+        self.test_order_item_1.quantity = 3
+        self.test_order_item_1.save()
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_generate_dataset_and_run_benchmarks(self):
+        call_command('generate_dataset', shops=2, matrices=2, category_depth=2, category_width=2, products=30,
+                     days=2, orders_per_day=3, items_per_order=4, stdout=StringIO())
+        self.assertEqual(Order.objects.filter(created__lt=self.test_order_1.created).count(), 6)
+
+        output = StringIO()
+        call_command('run_benchmarks', repeat=1, cart_size=3, stdout=output)
+        report = json.loads(output.getvalue())
+
+        self.assertIn('create_order_service', [result['name'] for result in report['results']])
+        self.assertEqual(Order.objects.count(), 10)
+
+    def test_repeat_order_api(self):
+        self.test_shop_user.shop = Shop.objects.create(
+            address='Test address', product_matrix=self.test_matrix,
+            stock=Stock.objects.create(name='Test stock', stock_type=Stock.ORDINARY))
+        self.test_shop_user.save()
+        self.test_product_1.price = 4
+        self.test_product_1.save()
+        self.test_product_2.matrix.clear()
+
+        client = APIClient()
+        client.force_authenticate(self.test_user)
+        response = client.post(f'/api/v1/orders/{self.test_order_id}/repeat')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['added'], response.data['skipped']), (1, ['Koala meat 200g.']))
+        self.assertEqual(CartItem.objects.get(user=self.test_shop_user).total, 728)
+
+        other_order = Order.objects.create(user=ShopUser.objects.create(user=User.objects.create_user('paul')))
+        self.assertEqual(client.post(f'/api/v1/orders/{other_order.id}/repeat').status_code, 404)
+
+    def test_repeat_order_refreshes_cart_prices(self):
+        self.test_shop_user.shop = Shop.objects.create(
+            address='Test address', product_matrix=self.test_matrix,
+            stock=Stock.objects.create(name='Test stock', stock_type=Stock.ORDINARY))
+        self.test_shop_user.save()
+
+        # Товар уже в корзине по старой цене
+        session_cart = Cart(self.client.session)
+        session_cart.add(self.test_product_1, 1)
+        database_cart = DatabaseCart(self.test_shop_user)
+        database_cart.add(self.test_product_1, 1)
+
+        self.test_product_1.price = 4
+        self.test_product_1.save()
+
+        for cart in (session_cart, database_cart):
+            repeat_order_service(self.test_user, self.test_order_id, cart)
+            line = next(line for line in cart if line['product_id'] == self.test_product_1.id)
+
+            self.assertEqual((line['price'], line['quantity'], line['total_price']),
+                             (Decimal('4.00'), Decimal('2.82'), Decimal('11.28')))
+            self.assertEqual(cart.get_total_price(), Decimal('165.60'))
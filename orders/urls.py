@@ -9,6 +9,7 @@ urlpatterns = [
     path('<int:pk>/', include([
         path('', views.MerchandiserOrderView.as_view(), name='merchandiser_view_order'),
         path('shipped/', views.set_order_as_shipped_view, name='shipped_order'),
+        path('repeat/', views.repeat_order_view, name='repeat_order'),
     ])),
     path('create/', views.create_order_view, name='order_create'),
     path('packer/', include([
@@ -1,3 +1,5 @@
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.utils import timezone
 
 try:
@@ -15,3 +17,14 @@ def get_today_process_bid_datetime() -> timezone.datetime:
     date = timezone.datetime(year=today.year, month=today.month, day=today.day, tzinfo=None, **BID_TIME)
 
     return date
+
+
+def round_cost(value) -> Decimal:
+    """Округление стоимости до копеек по правилам арифметики (0.5 копейки в большую сторону)
+
+    Так же округляет ROUND в PostgreSQL, поэтому суммы, посчитанные в базе и в коде, совпадают.
+
+    :param value: Стоимость
+    :return: Стоимость, округлённая до копеек
+    """
+    return Decimal(str(value)).quantize(Decimal('0.01'), ROUND_HALF_UP)
@@ -4,13 +4,13 @@ from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMix
 from django.core.paginator import Paginator
 from django.db.utils import Error
 from django.http import HttpResponseRedirect
-from django.shortcuts import render
+from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.views import generic
 from django.views.decorators.http import require_POST
 
 from accounts.models import ShopUser
-from cart.cart import Cart
+from cart.cart import get_cart
 from .exceptions import ContainerOverflowException, NotPackedException, NotSortedException, CartIsEmptyException
 from .forms import (AddContainerToOrderForm, AddContainerToOrderItemForm)
 from .models import Order, OrderItem, Container
@@ -19,7 +19,7 @@ from .services.container_services import (set_container_to_order_service, set_co
                                           get_order_item_and_containers_with_form)
 from .services.order_services import (create_order_service, set_order_as_packed_service,
                                       set_order_as_shipped_service, set_order_item_as_packed_service,
-                                      get_orders_by_shop_user_service)
+                                      get_orders_by_shop_user_service, repeat_order_service)
 
 
 @login_required()
@@ -27,7 +27,7 @@ from .services.order_services import (create_order_service, set_order_as_packed_
 def create_order_view(request):
     """ Создание заявки """
     try:
-        order = create_order_service(request.user, Cart(request.session))
+        order = create_order_service(request.user, get_cart(request))
         return render(request, 'orders/merchandiser/created.html', context={'order': order})
     except Error:
         messages.error(request, 'При создании заявки произошла ошибка')
@@ -39,6 +39,27 @@ def create_order_view(request):
     return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
 
 
+@require_POST
+@login_required()
+@permission_required('orders.add_order')
+def repeat_order_view(request, pk):
+    """ Повтор заявки: перенос строк заявки в корзину """
+    try:
+        added, skipped = repeat_order_service(request.user, pk, get_cart(request))
+        messages.success(request, f'В корзину добавлено товаров: {added}')
+
+        if skipped:
+            messages.warning(request, f'Товары выведены из матрицы и не добавлены: {", ".join(skipped)}')
+
+        return redirect('cart:cart_detail')
+    except ShopUser.DoesNotExist:
+        messages.error(request, f'Пользователь магазина для {str(request.user)} не найден')
+    except Order.DoesNotExist:
+        messages.error(request, f'Заявки с идентификатором {str(pk)} не существует')
+
+    return HttpResponseRedirect(request.META.get('HTTP_REFERER', '/'))
+
+
 class MerchandiserOrderListView(LoginRequiredMixin, PermissionRequiredMixin, generic.ListView):
     """ Просмотр списка заявок пользователя """
     model = Order